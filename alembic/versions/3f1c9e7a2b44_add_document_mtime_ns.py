@@ -0,0 +1,28 @@
+"""Add documents.mtime_ns
+
+Revision ID: 3f1c9e7a2b44
+Revises: 5a58dbe62bea
+Create Date: 2026-10-17 09:12:05.114208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9e7a2b44'
+down_revision: Union[str, Sequence[str], None] = '5a58dbe62bea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('mtime_ns', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'mtime_ns')
@@ -0,0 +1,35 @@
+"""Add documents.basename
+
+Revision ID: 8d2e4b6c1a90
+Revises: 3f1c9e7a2b44
+Create Date: 2026-10-17 09:48:31.502317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b6c1a90'
+down_revision: Union[str, Sequence[str], None] = '3f1c9e7a2b44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('basename', sa.String(length=500), nullable=True))
+    op.create_index(op.f('ix_documents_basename'), 'documents', ['basename'], unique=False)
+    # Backfill: basename is everything after the last path separator
+    op.execute(
+        "UPDATE documents SET basename = "
+        "regexp_replace(file_path, '^.*[\\\\/]', '')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_documents_basename'), table_name='documents')
+    op.drop_column('documents', 'basename')
@@ -0,0 +1,27 @@
+"""Add composite index on documents (drive, md5_hash)
+
+Revision ID: b7e5a3d91c2f
+Revises: 8d2e4b6c1a90
+Create Date: 2026-10-17 11:02:44.681935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e5a3d91c2f'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b6c1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_drive_md5', 'documents', ['drive', 'md5_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_drive_md5', table_name='documents')
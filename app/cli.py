@@ -17,6 +17,7 @@ from app.search import (
     get_document_statistics
 )
 from app.sync import analyze_drive_sync, sync_drives
+from app.reports import log_activity
 from app.file_scanner import find_duplicates, find_all_duplicates, calculate_space_savings
 from app.corrupted_pdf import (
     find_corrupted_pdfs, get_corrupted_pdf_report,
@@ -324,7 +325,6 @@ def _delete_duplicates_interactive(duplicates_dict, duplicate_type):
                 
                 # Log deletion activity
                 if deleted_files:
-                    from app.reports import log_activity
                     log_activity(
                         activity_type="delete",
                         description=f"Deleted {len(deleted_files)} duplicate files ({duplicate_type})",
@@ -382,9 +382,10 @@ def sync(
     if not dry_run:
         if Confirm.ask("\nProceed with synchronization?"):
             console.print("\n[bold green]Synchronizing...[/bold green]")
+            # Reuse the analysis shown above instead of running it again
             result = sync_drives(
                 drive1.upper(), drive2.upper(),
-                dry_run=False
+                dry_run=False, analysis=analysis
             )
 
             console.print(f"\n[green]Copied {result['copied_to_drive1']} "
@@ -37,7 +37,13 @@ class Settings(BaseSettings):
         ".fb2", ".html", ".rtf", ".gif", ".ppt", ".mp3"
     ]
     enable_fulltext_search: bool = True
-    chunk_size: int = 8192
+    chunk_size: int = 1024 * 1024  # Read buffer for hashing/copying (1 MiB)
+    # Parallel MD5 workers for folder scans (0 = one per CPU, 1 = hash
+    # sequentially, which suits spinning disks)
+    hash_workers: int = 0
+    # Concurrent copies during a sync (0 = twice the CPU count, up to 32;
+    # 1 = one file at a time)
+    copy_workers: int = 0
 
     # Security settings
     secret_key: str = (
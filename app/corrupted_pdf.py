@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from app.database import Document, SessionLocal
 from app.file_scanner import extract_pdf_text, extract_pdf_author
+from app.reports import log_activity
 
 
 def is_pdf_corrupted(file_path: str) -> bool:
@@ -167,7 +168,6 @@ def remove_corrupted_pdf(file_path: str,
                     db.commit()
 
                 # Log activity
-                from app.reports import log_activity
                 log_activity(
                     activity_type="delete_corrupted",
                     description=f"Removed corrupted PDF: {file_path}",
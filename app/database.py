@@ -1,5 +1,6 @@
 """Database models and session management."""
 
+import os
 from sqlalchemy import (
     create_engine, Column, String, Integer, DateTime,
     BigInteger, Text, Index, Boolean, ForeignKey, text
@@ -23,6 +24,7 @@ class Document(Base):
     name = Column(String(500), nullable=False, index=True)
     file_path = Column(String(1000), unique=True, nullable=False,
                        index=True)
+    basename = Column(String(500), nullable=True, index=True)
     drive = Column(String(10), nullable=False, index=True)
     directory = Column(String(1000), nullable=False, index=True)
     author = Column(String(500), nullable=True)
@@ -31,6 +33,7 @@ class Document(Base):
     date_created = Column(DateTime, nullable=True)
     date_published = Column(DateTime, nullable=True)
     md5_hash = Column(String(32), nullable=False, index=True)
+    mtime_ns = Column(BigInteger, nullable=True)  # st_mtime_ns when hashed
     file_type = Column(String(10), nullable=False, index=True)
     extracted_text = Column(Text, nullable=True)
     extracted_text_preview = Column(String(8192), nullable=True)
@@ -40,6 +43,7 @@ class Document(Base):
     __table_args__ = (
         Index('idx_drive_dir', 'drive', 'directory'),
         Index('idx_md5_hash', 'md5_hash'),
+        Index('idx_drive_md5', 'drive', 'md5_hash'),
         Index('idx_name_author', 'name', 'author'),
     )
 
@@ -119,6 +123,7 @@ def init_db(db_engine=None) -> None:
     db_engine = db_engine or engine
     Base.metadata.create_all(bind=db_engine)
     migrate_add_role_column(db_engine)
+    migrate_add_document_columns(db_engine)
     init_fts5(db_engine)
 
 
@@ -169,6 +174,69 @@ def migrate_add_role_column(db_engine=None) -> None:
         conn.close()
 
 
+# Columns added to documents after the initial schema: {name: SQL type}
+DOCUMENT_MIGRATION_COLUMNS = {
+    "mtime_ns": "BIGINT",
+    "basename": "VARCHAR(500)",
+}
+
+# Indexes added after the initial schema: {index name: column list}
+DOCUMENT_MIGRATION_INDEXES = {
+    "ix_documents_basename": "basename",
+    "idx_drive_md5": "drive, md5_hash",
+}
+
+
+def migrate_add_document_columns(db_engine=None) -> None:
+    """Add newer columns to the documents table if they don't exist."""
+    db_engine = db_engine or engine
+    db_url = str(db_engine.url)
+    conn = db_engine.connect()
+    try:
+        if "postgresql" in db_url or "postgres" in db_url:
+            result = conn.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'documents'
+            """))
+            columns = {row[0] for row in result.fetchall()}
+        else:
+            cursor = conn.execute(text("PRAGMA table_info(documents)"))
+            columns = {row[1] for row in cursor.fetchall()}
+
+        for name, column_type in DOCUMENT_MIGRATION_COLUMNS.items():
+            if name not in columns:
+                conn.execute(text(
+                    f"ALTER TABLE documents ADD COLUMN {name} {column_type}"
+                ))
+                print(f"Added '{name}' column to documents table")
+        for index_name, column in DOCUMENT_MIGRATION_INDEXES.items():
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {index_name} "
+                f"ON documents ({column})"
+            ))
+
+        # One-time backfill of basenames for rows indexed before the column
+        # existed (SQLite has no reverse-search string function, so split
+        # the paths here)
+        rows = conn.execute(text(
+            "SELECT id, file_path FROM documents WHERE basename IS NULL"
+        )).fetchall()
+        if rows:
+            conn.execute(
+                text("UPDATE documents SET basename = :basename WHERE id = :id"),
+                [{"id": row[0], "basename": os.path.basename(row[1])}
+                 for row in rows]
+            )
+            print(f"Backfilled basename for {len(rows)} documents")
+        conn.commit()
+    except Exception as e:
+        print(f"Warning: Could not migrate documents table: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
 def init_fts5(db_engine=None) -> None:
     """
     Initialize FTS5 virtual table for full-text search.
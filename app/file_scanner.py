@@ -1,24 +1,58 @@
 """File system scanner for documents."""
 
 import os
+import sys
 import hashlib
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime
 
 from app.config import settings
 from app.database import Document, get_db_session
+from app.reports import log_activity
 
 
-def calculate_md5(file_path: str) -> str:
-    """Calculate MD5 hash of a file."""
+# Paths per IN (...) query when bulk indexing
+INDEX_BATCH_SIZE = 500
+
+# hashlib.file_digest (Python 3.11+) runs the read/update loop in C;
+# older interpreters use the readinto loop in _md5_stream
+HAS_FILE_DIGEST = sys.version_info >= (3, 11)
+
+
+def _md5_stream(f, size: int) -> str:
+    """Hash an open file with buffered reads."""
+    if HAS_FILE_DIGEST:
+        return hashlib.file_digest(f, "md5").hexdigest()
     md5_hash = hashlib.md5()
+    # Reuse one buffer for the whole file; hashlib releases the GIL while
+    # hashing large blocks, so big reads keep OpenSSL's MD5 busy.
+    buffer = bytearray(min(settings.chunk_size, size + 1))
+    view = memoryview(buffer)
+    while True:
+        read_bytes = f.readinto(buffer)
+        if not read_bytes:
+            break
+        md5_hash.update(view[:read_bytes])
+    return md5_hash.hexdigest()
+
+
+def calculate_md5(file_path: str) -> str:
+    """
+    Calculate MD5 hash of a file.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        MD5 hex digest
+    """
     try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(settings.chunk_size), b""):
-                md5_hash.update(chunk)
-        return md5_hash.hexdigest()
-    except (IOError, OSError) as e:
+        with open(file_path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            return _md5_stream(f, size)
+    except (IOError, OSError, ValueError) as e:
         raise IOError(f"Error calculating MD5 for {file_path}: {e}")
 
 
@@ -34,10 +68,12 @@ def get_file_metadata(file_path: str) -> Dict:
     return {
         "name": path_obj.stem,
         "file_path": file_path,
+        "basename": path_obj.name,
         "drive": drive,
         "directory": directory,
         "size": stat_info.st_size,
         "size_on_disc": stat_info.st_size,  # Simplified for now
+        "mtime_ns": stat_info.st_mtime_ns,
         "date_created": datetime.fromtimestamp(stat_info.st_ctime),
         "date_published": None,  # Will extract from PDF metadata if available
         "file_type": path_obj.suffix.lower(),
@@ -114,13 +150,15 @@ def scan_all_drives(file_extensions: Optional[List[str]] = None,
 
 
 def index_document(file_path: str,
-                   extract_text: bool = True) -> Optional[Document]:
+                   extract_text: bool = True,
+                   md5_hash: Optional[str] = None) -> Optional[Document]:
     """
     Index a document and store in database.
 
     Args:
         file_path: Path to the document
         extract_text: Whether to extract text content
+        md5_hash: Precomputed MD5 of the file (computed here if None)
 
     Returns:
         Document object if successful, None otherwise
@@ -133,9 +171,6 @@ def index_document(file_path: str,
         # Get metadata
         metadata = get_file_metadata(file_path)
 
-        # Calculate MD5
-        md5_hash = calculate_md5(file_path)
-
         # Check if already indexed
         from app.database import SessionLocal
         db = SessionLocal()
@@ -186,10 +221,24 @@ def index_document(file_path: str,
                 Document.file_path == file_path
             ).first()
 
+            # Calculate MD5 unless the caller already hashed the file or
+            # the indexed record still matches its size and mtime
+            if md5_hash is None:
+                if (existing and existing.md5_hash
+                        and existing.size == metadata["size"]
+                        and existing.mtime_ns == metadata["mtime_ns"]):
+                    md5_hash = existing.md5_hash
+                else:
+                    md5_hash = calculate_md5(file_path)
+
             if existing:
                 # Update if needed
                 for key, value in metadata.items():
                     setattr(existing, key, value)
+                if existing.md5_hash != md5_hash and not extract_text:
+                    # Content changed: text of the old version is stale
+                    existing.extracted_text = None
+                    existing.extracted_text_preview = None
                 existing.md5_hash = md5_hash
                 if extract_text:
                     extracted_text = extract_text_content(file_path)
@@ -214,6 +263,7 @@ def index_document(file_path: str,
             document = Document(
                 name=metadata["name"],
                 file_path=metadata["file_path"],
+                basename=metadata["basename"],
                 drive=metadata["drive"],
                 directory=metadata["directory"],
                 size=metadata["size"],
@@ -221,6 +271,7 @@ def index_document(file_path: str,
                 date_created=metadata["date_created"],
                 date_published=metadata["date_published"],
                 md5_hash=md5_hash,
+                mtime_ns=metadata["mtime_ns"],
                 file_type=metadata["file_type"],
                 extracted_text=extracted_text,
                 extracted_text_preview=extracted_text_preview,
@@ -249,6 +300,212 @@ def index_document(file_path: str,
         return None
 
 
+def _template_fields(file_path: str, template: Document) -> Dict:
+    """Document fields for a copy of template stored at file_path."""
+    path_obj = Path(file_path)
+    return {
+        "name": path_obj.stem,
+        "basename": path_obj.name,
+        "drive": file_path[0] if len(file_path) > 1 and file_path[1] == ':' else "",
+        "directory": str(path_obj.parent),
+        "size": template.size,
+        "size_on_disc": template.size_on_disc,
+        "mtime_ns": template.mtime_ns,  # Copies keep the mtime (copystat)
+        "date_created": datetime.now(),
+        "date_published": template.date_published,
+        "md5_hash": template.md5_hash,
+        "file_type": path_obj.suffix.lower(),
+        "author": template.author,
+        "extracted_text": template.extracted_text,
+        "extracted_text_preview": template.extracted_text_preview,
+    }
+
+
+def index_document_from_template(file_path: str,
+                                 template: Document) -> Optional[Document]:
+    """
+    Index a verified copy of an already indexed document.
+
+    Content fields (MD5, size, text, author) come from the source row,
+    so the copy is not stat'ed, hashed or parsed again.
+
+    Args:
+        file_path: Path of the copy
+        template: Document of the file it was copied from
+
+    Returns:
+        Document object if successful, None otherwise
+    """
+    fields = _template_fields(file_path, template)
+
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        document = db.query(Document).filter(
+            Document.file_path == file_path
+        ).first()
+        if document is None:
+            document = Document(file_path=file_path)
+            db.add(document)
+        for key, value in fields.items():
+            setattr(document, key, value)
+        db.commit()
+        db.refresh(document)
+        return document
+    except Exception as e:
+        db.rollback()
+        print(f"Error indexing {file_path}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def index_documents_from_templates(copies: List[Tuple[str, Document]],
+                                   errors: Optional[List[str]] = None) -> int:
+    """
+    Index many verified copies in a single transaction.
+
+    Bulk counterpart of index_document_from_template(). Each row is
+    written in its own savepoint, so a bad row only loses that copy.
+
+    Args:
+        copies: (path of the copy, Document it was copied from) pairs
+        errors: List that per-copy indexing failures are appended to
+
+    Returns:
+        Number of copies indexed
+    """
+    template_by_path = dict(copies)
+    paths = sorted(template_by_path)
+    indexed = 0
+
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        for start in range(0, len(paths), INDEX_BATCH_SIZE):
+            batch = paths[start:start + INDEX_BATCH_SIZE]
+            existing = {
+                doc.file_path: doc for doc in db.query(Document).filter(
+                    Document.file_path.in_(batch)
+                )
+            }
+            for file_path in batch:
+                try:
+                    with db.begin_nested():
+                        document = existing.get(file_path)
+                        if document is None:
+                            document = Document(file_path=file_path)
+                            db.add(document)
+                        fields = _template_fields(
+                            file_path, template_by_path[file_path]
+                        )
+                        for key, value in fields.items():
+                            setattr(document, key, value)
+                        # Surface constraint errors inside the savepoint
+                        db.flush()
+                    indexed += 1
+                except Exception as e:
+                    message = f"Error indexing {file_path}: {e}"
+                    print(message)
+                    if errors is not None:
+                        errors.append(message)
+        db.commit()
+        return indexed
+    except Exception as e:
+        db.rollback()
+        message = f"Error indexing {len(paths)} copied files: {e}"
+        print(message)
+        if errors is not None:
+            errors.append(message)
+        return 0
+    finally:
+        db.close()
+
+
+def index_documents(md5_by_path: Dict[str, Optional[str]],
+                    errors: Optional[List[str]] = None) -> int:
+    """
+    Index already hashed files in a single transaction.
+
+    Bulk counterpart of index_document(file_path, extract_text=False):
+    existing rows are loaded a batch of paths at a time and everything is
+    committed once, instead of a session and a commit per file. Each row
+    is written in its own savepoint, so a bad row only loses that file.
+
+    Args:
+        md5_by_path: MD5 of each file; files mapped to None are skipped
+        errors: List that per-file indexing failures are appended to
+
+    Returns:
+        Number of files indexed
+    """
+    paths = sorted(path for path, md5_hash in md5_by_path.items() if md5_hash)
+    indexed = 0
+
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        for start in range(0, len(paths), INDEX_BATCH_SIZE):
+            batch = paths[start:start + INDEX_BATCH_SIZE]
+            existing = {
+                doc.file_path: doc for doc in db.query(Document).filter(
+                    Document.file_path.in_(batch)
+                )
+            }
+            for file_path in batch:
+                try:
+                    metadata = get_file_metadata(file_path)
+                except OSError:
+                    # Removed or unreadable since it was hashed
+                    continue
+                try:
+                    with db.begin_nested():
+                        _index_hashed_row(db, existing.get(file_path),
+                                          metadata, md5_by_path[file_path])
+                    indexed += 1
+                except Exception as e:
+                    message = f"Error indexing {file_path}: {e}"
+                    print(message)
+                    if errors is not None:
+                        errors.append(message)
+        db.commit()
+        return indexed
+    except Exception as e:
+        db.rollback()
+        message = f"Error indexing {len(paths)} files: {e}"
+        print(message)
+        if errors is not None:
+            errors.append(message)
+        return 0
+    finally:
+        db.close()
+
+
+def _index_hashed_row(db, document: Optional[Document], metadata: Dict,
+                      md5_hash: str) -> None:
+    """Create or update the row of one hashed file and flush it."""
+    file_path = metadata["file_path"]
+    if document is None:
+        document = Document()
+        # Extract author if available from PDF metadata
+        if metadata["file_type"] == ".pdf":
+            try:
+                document.author = extract_pdf_author(file_path)
+            except Exception:
+                # Silently skip if author extraction fails
+                pass
+        db.add(document)
+    for key, value in metadata.items():
+        setattr(document, key, value)
+    if document.md5_hash and document.md5_hash != md5_hash:
+        # Content changed: text of the old version is stale
+        document.extracted_text = None
+        document.extracted_text_preview = None
+    document.md5_hash = md5_hash
+    # Surface constraint errors inside this row's savepoint
+    db.flush()
+
+
 def extract_text_content(file_path: str) -> Optional[str]:
     """Extract text content from document."""
     file_ext = os.path.splitext(file_path)[1].lower()
@@ -427,10 +684,8 @@ def find_duplicates() -> Dict[str, List[Document]]:
     try:
         documents = db.query(Document).all()
 
-        hash_groups = {}
+        hash_groups = defaultdict(list)
         for doc in documents:
-            if doc.md5_hash not in hash_groups:
-                hash_groups[doc.md5_hash] = []
             hash_groups[doc.md5_hash].append(doc)
 
         # Return only groups with duplicates
@@ -454,13 +709,10 @@ def find_duplicate_by_name() -> Dict[str, List[Document]]:
     try:
         documents = db.query(Document).all()
 
-        name_groups = {}
+        name_groups = defaultdict(list)
         for doc in documents:
             # Normalize name (lowercase, strip whitespace)
-            normalized_name = doc.name.lower().strip()
-            if normalized_name not in name_groups:
-                name_groups[normalized_name] = []
-            name_groups[normalized_name].append(doc)
+            name_groups[doc.name.lower().strip()].append(doc)
 
         # Return only groups with same name but different MD5 (different content)
         duplicates = {}
@@ -542,7 +794,6 @@ def delete_duplicate_file(file_path: str,
         user_id: User ID who performed the deletion
     """
     import os
-    from app.reports import log_activity
 
     try:
         if os.path.exists(file_path):
@@ -571,7 +822,6 @@ def move_document(source_path: str,
         user_id: User ID who performed the move
     """
     import shutil
-    from app.reports import log_activity
 
     try:
         shutil.move(source_path, target_path)
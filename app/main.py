@@ -25,7 +25,7 @@ from app.auth import (
 )
 from app.reports import (
     get_activities, get_space_saved_report, get_operations_report,
-    log_activity
+    log_activity, log_activity_bulk
 )
 from app.corrupted_pdf import (
     get_corrupted_pdf_report, find_corrupted_pdfs, remove_corrupted_pdf
@@ -1422,7 +1422,6 @@ async def copy_file(
     from app.database import SessionLocal, Document
     from app.file_scanner import calculate_md5
     from app.sync import _index_copied_file
-    from app.reports import log_activity
     import shutil
     import os
     
@@ -1636,7 +1635,6 @@ async def eliminate_duplicates_folder(
     For each duplicate group, finds the latest file (by date_modified or 
     date_created) and deletes all other files in the target folder.
     """
-    from app.reports import log_activity
     
     duplicates = request.get("duplicates", [])
     target_folder = request.get("target_folder", 1)  # 1 or 2
@@ -1651,6 +1649,7 @@ async def eliminate_duplicates_folder(
     kept_count = 0
     space_freed = 0
     errors = []
+    pending_activities = []  # Logged in one batch after the loop
     
     try:
         for dup in duplicates:
@@ -1852,17 +1851,13 @@ async def eliminate_duplicates_folder(
                             )
                     
                     # Log activity
-                    try:
-                        log_activity(
-                            activity_type="delete_duplicates",
-                            description=f"Deleted duplicate file: {file_path}",
-                            document_path=file_path,
-                            space_saved_bytes=file_size,
-                            operation_count=1,
-                            user_id=current_user.id if current_user else None
-                        )
-                    except Exception:
-                        pass
+                    pending_activities.append({
+                        "activity_type": "delete_duplicates",
+                        "description": f"Deleted duplicate file: {file_path}",
+                        "document_path": file_path,
+                        "space_saved_bytes": file_size,
+                        "user_id": current_user.id if current_user else None
+                    })
                         
                 except PermissionError as e:
                     errors.append(
@@ -1872,6 +1867,11 @@ async def eliminate_duplicates_folder(
                 except Exception as e:
                     errors.append(f"Error deleting {file_path}: {str(e)}")
         
+        try:
+            log_activity_bulk(pending_activities)
+        except Exception:
+            pass  # Don't fail if logging fails
+        
         # Clean up database entries for files that no longer exist on disk
         # This ensures the database is consistent with the file system
         try:
@@ -1885,9 +1885,11 @@ async def eliminate_duplicates_folder(
                 if target_folder_path and len(target_folder_path) >= 2 and target_folder_path[1] == ':':
                     target_folder_path = target_folder_path[0].upper() + target_folder_path[1:]
                 
-                # Find all documents in the target folder
+                # Find all documents in the target folder (see
+                # _under_folder; also skips sibling folders sharing the prefix)
+                from app.sync import _under_folder
                 docs_to_check = db.query(Document).filter(
-                    Document.file_path.like(f"{target_folder_path}%")
+                    _under_folder(target_folder_path)
                 ).all()
                 
                 # Remove database entries for files that no longer exist
@@ -1942,7 +1944,6 @@ async def eliminate_duplicates(
     For each duplicate group, finds the latest file (by date_modified or 
     date_created) and deletes all other files.
     """
-    from app.reports import log_activity
     
     duplicates = request.get("duplicates", [])
     
@@ -1955,6 +1956,7 @@ async def eliminate_duplicates(
     deleted_count = 0
     kept_count = 0
     errors = []
+    pending_activities = []  # Logged in one batch after the loop
     
     try:
         for dup in duplicates:
@@ -2153,17 +2155,13 @@ async def eliminate_duplicates(
                             logging.warning(f"Database error when removing file from database (id={doc_id}): {str(e)}")
                     
                     # Log activity
-                    try:
-                        log_activity(
-                            activity_type="delete_duplicates",
-                            description=f"Deleted duplicate file: {file_path}",
-                            document_path=file_path,
-                            space_saved_bytes=file_size,
-                            operation_count=1,
-                            user_id=current_user.id if current_user else None
-                        )
-                    except Exception:
-                        pass  # Don't fail if logging fails
+                    pending_activities.append({
+                        "activity_type": "delete_duplicates",
+                        "description": f"Deleted duplicate file: {file_path}",
+                        "document_path": file_path,
+                        "space_saved_bytes": file_size,
+                        "user_id": current_user.id if current_user else None
+                    })
                         
                 except PermissionError as e:
                     # Try to get the process name(s) that have the file locked
@@ -2190,6 +2188,11 @@ async def eliminate_duplicates(
                     file_name = os.path.basename(file_path)
                     errors.append(f"Error deleting '{file_name}': {str(e)}")
         
+        try:
+            log_activity_bulk(pending_activities)
+        except Exception:
+            pass  # Don't fail if logging fails
+        
         return {
             "success": True,
             "deleted_count": deleted_count,
@@ -2,7 +2,7 @@
 
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, insert
 from sqlalchemy.orm import Session
 
 from app.database import Activity, SessionLocal
@@ -46,6 +46,37 @@ def log_activity(activity_type: str,
         db.close()
 
 
+def log_activity_bulk(activities: List[Dict]) -> int:
+    """
+    Log many activities with a single multi-row INSERT.
+
+    Args:
+        activities: Dicts holding the keyword arguments of log_activity()
+
+    Returns:
+        Number of activities logged
+    """
+    if not activities:
+        return 0
+    rows = [
+        {
+            "user_id": None,
+            "document_path": None,
+            "space_saved_bytes": 0,
+            "operation_count": 1,
+            **activity
+        }
+        for activity in activities
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(Activity), rows)
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
 def get_activities(
     activity_type: Optional[str] = None,
     start_date: Optional[datetime] = None,
@@ -1,15 +1,284 @@
 """Drive and folder synchronization functionality."""
 
 import os
+import atexit
+import errno
+import sys
 import math
+import hashlib
 import shutil
-from typing import Dict, List, Optional, Tuple
+import functools
+import logging
+import multiprocessing
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import (
+    ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import time
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
+
+from app.config import settings
 from app.database import Document, SessionLocal
-from app.file_scanner import scan_drive, calculate_md5
+from app.file_scanner import (
+    scan_drive, calculate_md5, index_documents, index_document_from_template,
+    index_documents_from_templates
+)
+from app.reports import log_activity_bulk
+
+logger = logging.getLogger(__name__)
+
+
+# Lowercased supported extensions as a frozenset, rebuilt only when the
+# configured list changes (settings can be edited at runtime).
+_ext_cache_key: Optional[Tuple[str, ...]] = None
+_ext_cache: frozenset = frozenset()
+
+
+# Below this many files, hashing in-process beats shipping work to a pool
+PARALLEL_HASH_MIN_FILES = 64
+PARALLEL_HASH_CHUNK = 32
+
+# Shared hashing pool and the worker count it was created with; replaced
+# when settings.hash_workers changes and shut down at interpreter exit
+_hash_pool_lock = threading.Lock()
+_hash_pool_workers: Optional[int] = None
+_hash_pool_executor: Optional[ProcessPoolExecutor] = None
+
+# Windows filesystems ignore case in paths; POSIX filesystems do not
+CASE_INSENSITIVE_PATHS = os.name == "nt"
+
+# Ids per IN (...) query when loading documents by id
+LOAD_BATCH_SIZE = 500
+
+# Stand-in creation date for documents that have none
+_EPOCH = datetime.fromtimestamp(0)
+
+# ioctl request that clones a file on copy-on-write filesystems (linux/fs.h)
+FICLONE = 0x40049409
+
+# Per-thread copy buffer, reused from one file to the next instead of
+# allocating settings.chunk_size bytes for every copy
+_copy_buffers = threading.local()
+
+# Whether FICLONE works from one device to another, keyed by the
+# (source st_dev, target st_dev) pair, so unsupported pairs fail only once
+_reflink_support: Dict[Tuple[int, int], bool] = {}
+
+# ioctl errors meaning "never works on this device pair", as opposed to
+# a problem with one particular file
+_REFLINK_UNSUPPORTED = frozenset(
+    getattr(errno, name) for name in
+    ("EOPNOTSUPP", "ENOTTY", "EXDEV", "ENOSYS")
+    if hasattr(errno, name)
+)
+
+# Bytes requested per os.copy_file_range() call (the kernel may move less)
+COPY_RANGE_CHUNK = 64 * 1024 * 1024
+
+# copy_file_range errors meaning "use a userspace copy instead"
+_COPY_RANGE_UNSUPPORTED = frozenset(
+    getattr(errno, name) for name in
+    ("EXDEV", "ENOSYS", "EOPNOTSUPP", "EINVAL")
+    if hasattr(errno, name)
+)
+
+# Minimum seconds between per-file "compare" progress events
+COMPARE_EMIT_INTERVAL = 0.05
+
+
+def _hash_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool used for hashing, created lazily."""
+    global _hash_pool_workers, _hash_pool_executor
+    workers = settings.hash_workers or os.cpu_count()
+    with _hash_pool_lock:
+        if _hash_pool_executor is None or _hash_pool_workers != workers:
+            if _hash_pool_executor is not None:
+                # Batches already submitted by other threads still finish
+                _hash_pool_executor.shutdown(wait=False)
+            # spawn matches Windows behaviour and is safe from threaded callers
+            _hash_pool_executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _hash_pool_workers = workers
+        return _hash_pool_executor
+
+
+def _shutdown_hash_pool() -> None:
+    """Shut down the shared hashing pool, if one was started."""
+    global _hash_pool_workers, _hash_pool_executor
+    with _hash_pool_lock:
+        if _hash_pool_executor is not None:
+            _hash_pool_executor.shutdown(wait=True, cancel_futures=True)
+        _hash_pool_executor = None
+        _hash_pool_workers = None
+
+
+atexit.register(_shutdown_hash_pool)
+
+
+def _hash_worker(file_path: str) -> Tuple[str, Optional[str]]:
+    """Hash one file in a pool worker; None if it cannot be read."""
+    try:
+        return file_path, calculate_md5(file_path)
+    except (IOError, OSError):
+        return file_path, None
+
+
+def hash_files(file_paths: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Calculate MD5 hashes for many files, in parallel for large batches.
+
+    Args:
+        file_paths: Paths of the files to hash
+
+    Returns:
+        Dictionary mapping file path to MD5 (None if unreadable)
+    """
+    if (settings.hash_workers != 1
+            and len(file_paths) >= PARALLEL_HASH_MIN_FILES):
+        try:
+            return dict(_hash_pool().map(
+                _hash_worker, file_paths, chunksize=PARALLEL_HASH_CHUNK
+            ))
+        except BrokenProcessPool:
+            # Drop the dead pool so the next call starts a fresh one
+            _shutdown_hash_pool()
+    return dict(_hash_worker(path) for path in file_paths)
+
+
+def _match_by_md5(docs1: List[Document], docs2: List[Document]
+                  ) -> Tuple[List[Dict], List[Document], List[Document]]:
+    """
+    Pair documents sharing a relative path by MD5.
+
+    Args:
+        docs1: Documents with this relative path in folder1
+        docs2: Documents with this relative path in folder2
+
+    Returns:
+        Tuple of (matched pairs, unmatched folder1 docs, unmatched folder2 docs)
+    """
+    # Fast path: a relative path almost always maps to one file per side
+    if len(docs1) == 1 and len(docs2) == 1:
+        doc1, doc2 = docs1[0], docs2[0]
+        # Differing sizes settle it without comparing the hex digests
+        if doc1.size == doc2.size and doc1.md5_hash == doc2.md5_hash:
+            return [{"folder1": doc1, "folder2": doc2,
+                     "md5": doc1.md5_hash}], [], []
+        return [], [doc1], [doc2]
+
+    f1_by_md5 = defaultdict(list)  # {md5: [docs]}
+    f2_by_md5 = defaultdict(list)
+    for d in docs1:
+        f1_by_md5[d.md5_hash].append(d)
+    for d in docs2:
+        f2_by_md5[d.md5_hash].append(d)
+
+    matched_pairs = []
+    unmatched_f1 = []
+    unmatched_f2 = []
+    for md5_hash, group1 in f1_by_md5.items():
+        group2 = f2_by_md5.get(md5_hash)
+        if not group2:
+            unmatched_f1.extend(group1)
+            continue
+        # Match pairs: take minimum count from both sides
+        pairs_count = min(len(group1), len(group2))
+        for i in range(pairs_count):
+            matched_pairs.append({
+                "folder1": group1[i],
+                "folder2": group2[i],
+                "md5": md5_hash
+            })
+        unmatched_f1.extend(group1[pairs_count:])
+        unmatched_f2.extend(group2[pairs_count:])
+    for md5_hash, group2 in f2_by_md5.items():
+        if md5_hash not in f1_by_md5:
+            unmatched_f2.extend(group2)
+    return matched_pairs, unmatched_f1, unmatched_f2
+
+
+def _folder_prefix(folder: str) -> str:
+    """Folder path with exactly one trailing separator."""
+    return folder if folder.endswith(("/", "\\")) else folder + os.sep
+
+
+def _relative_path(file_path: str, prefix: str) -> Optional[str]:
+    """
+    Path of a file relative to a folder prefix, with backslash separators.
+
+    Args:
+        file_path: Absolute file path
+        prefix: Folder path from _folder_prefix()
+
+    Returns:
+        Relative path, or None if the file is not under the folder
+    """
+    head = file_path[:len(prefix)]
+    if CASE_INSENSITIVE_PATHS:
+        # Matches the _under_folder() filter
+        head, prefix = head.lower(), prefix.lower()
+    if head != prefix:
+        return None
+    rel_path = file_path[len(prefix):]
+    # Normalize to use backslashes on Windows for consistency
+    if os.sep != '\\':
+        rel_path = rel_path.replace(os.sep, '\\')
+    return rel_path
+
+
+def _under_folder(folder: str):
+    """
+    Filter for documents stored under a folder.
+
+    A half-open range on file_path, an index seek on SQLite and
+    PostgreSQL alike. Appending the separator keeps sibling folders
+    sharing the prefix out. Where paths ignore case (Windows), c:\\Docs
+    and C:\\docs are the same folder, so an escaped case-insensitive
+    LIKE is used instead.
+
+    Args:
+        folder: Normalized absolute folder path
+
+    Returns:
+        SQLAlchemy filter expression
+    """
+    prefix = _folder_prefix(folder)
+    if CASE_INSENSITIVE_PATHS:
+        # '!' escapes, since backslash is the Windows path separator
+        escaped = (prefix.replace("!", "!!").replace("%", "!%")
+                   .replace("_", "!_"))
+        return Document.file_path.ilike(escaped + "%", escape="!")
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(Document.file_path >= prefix, Document.file_path < upper)
+
+
+def _extension_set() -> frozenset:
+    """Return the supported extensions as a cached lowercase frozenset."""
+    global _ext_cache_key, _ext_cache
+    key = tuple(settings.supported_extensions)
+    if key != _ext_cache_key:
+        _ext_cache = frozenset(sys.intern(ext.lower()) for ext in key)
+        _ext_cache_key = key
+    return _ext_cache
+
+
+def _sorted_paths(paths: set) -> List[str]:
+    """Sorted list of a path set; singletons (the common case) skip the sort."""
+    return list(paths) if len(paths) < 2 else sorted(paths)
 
 
 def format_file_info(doc: Document, include_full_path: bool = False) -> str:
@@ -23,7 +292,10 @@ def format_file_info(doc: Document, include_full_path: bool = False) -> str:
     Returns:
         Formatted string with file info
     """
-    file_name = doc.file_path if include_full_path else os.path.basename(doc.file_path)
+    if include_full_path:
+        file_name = doc.file_path
+    else:
+        file_name = doc.basename or os.path.basename(doc.file_path)
     
     # Format size
     if doc.size >= 1024 * 1024:
@@ -57,154 +329,120 @@ def format_file_info(doc: Document, include_full_path: bool = False) -> str:
     )
 
 
-def analyze_drive_sync(drive1: str, drive2: str) -> Dict:
+def _iter_documents(ids: List[int]) -> Iterator[Document]:
     """
-    Analyze what files need to be synced between two drives.
+    Stream Document rows by id, in id order.
+
+    The session is opened on first use and rows are fetched a batch at a
+    time, so callers that only need counts never load a Document.
 
     Args:
-        drive1: First drive letter
-        drive2: Second drive letter
+        ids: Document ids
 
-    Returns:
-        Dictionary with sync analysis information
+    Yields:
+        Document objects
     """
+    if not ids:
+        return
+    ids = sorted(ids)
     db = SessionLocal()
     try:
-        # Running counters for periodic progress updates
-        scanned_indexed: int = 0
-        equals_count: int = 0
-        needs_sync_count: int = 0
-        last_emit_time: float = 0.0
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(ids), LOAD_BATCH_SIZE):
+            yield from db.query(Document).filter(
+                Document.id.in_(ids[start:start + LOAD_BATCH_SIZE])
+            ).order_by(Document.id).all()
+    finally:
+        db.close()
 
-        def emit_progress(phase: str, extra: Optional[Dict] = None) -> None:
-            nonlocal last_emit_time
-            if not progress_callback:
-                return
-            now = time.time()
-            if now - last_emit_time >= 2.0:
-                payload: Dict = {
-                    "phase": phase,
-                    "scanned": scanned_indexed,
-                    "equals": equals_count,
-                    "needs_sync": needs_sync_count,
-                }
-                if extra:
-                    payload.update(extra)
-                progress_callback(payload)
-                last_emit_time = now
-        # Running counters for periodic progress updates
-        scanned_indexed: int = 0
-        equals_count: int = 0
-        needs_sync_count: int = 0
-        last_emit_time: float = 0.0
 
-        def emit_progress(phase: str, extra: Optional[Dict] = None) -> None:
-            nonlocal last_emit_time
-            if not progress_callback:
-                return
-            now = time.time()
-            if now - last_emit_time >= 2.0:
-                payload: Dict = {
-                    "phase": phase,
-                    "scanned": scanned_indexed,
-                    "equals": equals_count,
-                    "needs_sync": needs_sync_count,
-                }
-                if extra:
-                    payload.update(extra)
-                progress_callback(payload)
-                last_emit_time = now
-        # Running counters for progress reporting (folder analysis)
-        scanned_indexed: int = 0
-        equals_count: int = 0
-        needs_sync_count: int = 0
-        last_emit_time: float = 0.0
+class LazyDocuments:
+    """
+    Re-iterable view of Document rows by id.
 
-        def emit_progress(phase: str, extra: Optional[Dict] = None) -> None:
-            nonlocal last_emit_time
-            if not progress_callback:
-                return
-            now = time.time()
-            if now - last_emit_time >= 2.0:
-                payload: Dict = {
-                    "phase": phase,
-                    "scanned": scanned_indexed,
-                    "equals": equals_count,
-                    "needs_sync": needs_sync_count,
-                }
-                if extra:
-                    payload.update(extra)
-                progress_callback(payload)
-                last_emit_time = now
-        # Running counters for progress reporting
-        scanned_indexed: int = 0
-        equals_count: int = 0
-        needs_sync_count: int = 0
-        last_emit_time: float = 0.0
+    Each iteration streams the rows again through _iter_documents, so a
+    dry-run preview and a later sync can both consume the same analysis.
+    len() is answered from the ids without touching the database.
+    """
 
-        def emit_progress(phase: str, extra: Optional[Dict] = None):
-            nonlocal last_emit_time
-            if not progress_callback:
-                return
-            now = time.time()
-            if now - last_emit_time >= 2.0:
-                payload = {
-                    "phase": phase,
-                    "scanned": scanned_indexed,
-                    "equals": equals_count,
-                    "needs_sync": needs_sync_count,
-                }
-                if extra:
-                    payload.update(extra)
-                progress_callback(payload)
-                last_emit_time = now
-        docs_drive1 = db.query(Document).filter(
-            Document.drive == drive1.upper()
-        ).all()
+    def __init__(self, ids: List[int]):
+        self.ids = ids
 
-        docs_drive2 = db.query(Document).filter(
-            Document.drive == drive2.upper()
-        ).all()
+    def __iter__(self) -> Iterator[Document]:
+        return _iter_documents(self.ids)
 
-        # Group by MD5 hash
-        hash_to_docs1 = {}
-        hash_to_docs2 = {}
+    def __len__(self) -> int:
+        return len(self.ids)
 
-        for doc in docs_drive1:
-            if doc.md5_hash not in hash_to_docs1:
-                hash_to_docs1[doc.md5_hash] = []
-            hash_to_docs1[doc.md5_hash].append(doc)
 
-        for doc in docs_drive2:
-            if doc.md5_hash not in hash_to_docs2:
-                hash_to_docs2[doc.md5_hash] = []
-            hash_to_docs2[doc.md5_hash].append(doc)
+def _missing_on_drive(db, source_drive: str,
+                      target_drive: str) -> List[Tuple[int, int]]:
+    """
+    Find documents on source_drive whose MD5 is not on target_drive.
 
-        # Find files that exist on drive1 but not drive2
-        missing_on_drive2 = []
-        for hash_val, docs in hash_to_docs1.items():
-            if hash_val not in hash_to_docs2:
-                missing_on_drive2.extend(docs)
+    Args:
+        db: Database session
+        source_drive: Drive letter to copy from
+        target_drive: Drive letter to copy to
 
-        # Find files that exist on drive2 but not drive1
-        missing_on_drive1 = []
-        for hash_val, docs in hash_to_docs2.items():
-            if hash_val not in hash_to_docs1:
-                missing_on_drive1.extend(docs)
+    Returns:
+        List of (document id, size) tuples
+    """
+    source_rows = db.query(Document.id, Document.size).filter(
+        Document.drive == source_drive.upper()
+    )
+    # Initial seeding of an empty drive: everything is missing, skip the
+    # per-row EXISTS probe
+    if db.query(Document.id).filter(
+        Document.drive == target_drive.upper()
+    ).first() is None:
+        return source_rows.all()
+
+    other = aliased(Document)
+    on_target = db.query(other.id).filter(
+        other.drive == target_drive.upper(),
+        other.md5_hash == Document.md5_hash
+    ).exists()
+    return source_rows.filter(~on_target).all()
+
+
+def analyze_drive_sync(drive1: str, drive2: str) -> Dict:
+    """
+    Analyze what files need to be synced between two drives.
+
+    Args:
+        drive1: First drive letter
+        drive2: Second drive letter
+
+    Returns:
+        Dictionary with sync analysis information; files_to_copy_drive1/2
+        are LazyDocuments, re-iterable and loaded only when iterated
+    """
+    db = SessionLocal()
+    try:
+        # Anti-join in the database: only the (id, size) of files whose
+        # MD5 is absent from the other drive cross the DB boundary
+        missing_rows_drive2 = _missing_on_drive(db, drive1, drive2)
+        missing_rows_drive1 = _missing_on_drive(db, drive2, drive1)
 
         # Calculate space needed
-        space_needed_drive1 = sum(doc.size for doc in missing_on_drive1)
-        space_needed_drive2 = sum(doc.size for doc in missing_on_drive2)
+        space_needed_drive1 = sum(size for _, size in missing_rows_drive1)
+        space_needed_drive2 = sum(size for _, size in missing_rows_drive2)
 
+        # Documents are streamed only when a sync actually consumes them
         return {
             "drive1": drive1.upper(),
             "drive2": drive2.upper(),
-            "missing_on_drive1": len(missing_on_drive1),
-            "missing_on_drive2": len(missing_on_drive2),
+            "missing_on_drive1": len(missing_rows_drive1),
+            "missing_on_drive2": len(missing_rows_drive2),
             "space_needed_drive1": space_needed_drive1,
             "space_needed_drive2": space_needed_drive2,
-            "files_to_copy_drive1": missing_on_drive1,
-            "files_to_copy_drive2": missing_on_drive2,
+            "files_to_copy_drive1": LazyDocuments(
+                [row[0] for row in missing_rows_drive1]
+            ),
+            "files_to_copy_drive2": LazyDocuments(
+                [row[0] for row in missing_rows_drive2]
+            ),
         }
     finally:
         db.close()
@@ -213,7 +451,8 @@ def analyze_drive_sync(drive1: str, drive2: str) -> Dict:
 def sync_drives(drive1: str, drive2: str,
                 target_dir_drive1: str = "",
                 target_dir_drive2: str = "",
-                dry_run: bool = True) -> Dict:
+                dry_run: bool = True,
+                analysis: Optional[Dict] = None) -> Dict:
     """
     Synchronize files between two drives.
 
@@ -223,11 +462,14 @@ def sync_drives(drive1: str, drive2: str,
         target_dir_drive1: Target directory on drive1
         target_dir_drive2: Target directory on drive2
         dry_run: If True, only show what would be done
+        analysis: Result of analyze_drive_sync(drive1, drive2) the caller
+            already has (e.g. from a preview); analyzed here if None
 
     Returns:
         Dictionary with sync results
     """
-    analysis = analyze_drive_sync(drive1, drive2)
+    if analysis is None:
+        analysis = analyze_drive_sync(drive1, drive2)
 
     if dry_run:
         return {
@@ -236,73 +478,38 @@ def sync_drives(drive1: str, drive2: str,
             "message": "Dry run completed. No files were copied."
         }
 
-    copied_to_drive1 = []
-    copied_to_drive2 = []
     errors = []
 
-    # Copy files to drive1
-    for doc in analysis["files_to_copy_drive1"]:
-        try:
-            target_path = _get_target_path(
-                doc.file_path, drive1, target_dir_drive1
-            )
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            shutil.copy2(doc.file_path, target_path)
+    created_dirs = set()
+    with ThreadPoolExecutor(max_workers=_copy_workers()) as executor:
+        # Copy files to drive1
+        copied_to_drive1, batch_errors = _copy_to_drive(
+            executor, analysis["files_to_copy_drive1"], drive1,
+            target_dir_drive1, created_dirs
+        )
+        errors.extend(batch_errors)
 
-            # Verify MD5
-            new_hash = calculate_md5(target_path)
-            if new_hash == doc.md5_hash:
-                copied_to_drive1.append(target_path)
-                # Update database
-                _index_copied_file(target_path, doc)
-                # Log activity
-                from app.reports import log_activity
-                log_activity(
-                    activity_type="sync",
-                    description=f"Synced file to {drive1}:\\{target_path}",
-                    document_path=target_path,
-                    space_saved_bytes=0,
-                    operation_count=1,
-                    user_id=None
-                )
-            else:
-                errors.append(
-                    f"MD5 mismatch for {target_path}"
-                )
-        except Exception as e:
-            errors.append(f"Error copying {doc.file_path}: {e}")
+        # Copy files to drive2
+        copied_to_drive2, batch_errors = _copy_to_drive(
+            executor, analysis["files_to_copy_drive2"], drive2,
+            target_dir_drive2, created_dirs
+        )
+        errors.extend(batch_errors)
 
-    # Copy files to drive2
-    for doc in analysis["files_to_copy_drive2"]:
-        try:
-            target_path = _get_target_path(
-                doc.file_path, drive2, target_dir_drive2
-            )
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            shutil.copy2(doc.file_path, target_path)
-
-            # Verify MD5
-            new_hash = calculate_md5(target_path)
-            if new_hash == doc.md5_hash:
-                copied_to_drive2.append(target_path)
-                # Update database
-                _index_copied_file(target_path, doc)
-                # Log activity
-                from app.reports import log_activity
-                log_activity(
-                    activity_type="sync",
-                    description=f"Synced file to {drive2}:\\{target_path}",
-                    document_path=target_path,
-                    space_saved_bytes=0,
-                    operation_count=1,
-                    user_id=None
-                )
-            else:
-                errors.append(
-                    f"MD5 mismatch for {target_path}"
-                )
-        except Exception as e:
-            errors.append(f"Error copying {doc.file_path}: {e}")
+    try:
+        log_activity_bulk([
+            {
+                "activity_type": "sync",
+                "description": f"Synced file to {drive}:\\{target_path}",
+                "document_path": target_path,
+            }
+            for drive, copied in ((drive1, copied_to_drive1),
+                                  (drive2, copied_to_drive2))
+            for target_path in copied
+        ])
+    except Exception as e:
+        # The files are copied; report the logging failure with the result
+        errors.append(f"Error logging sync activity: {e}")
 
     return {
         "status": "completed",
@@ -312,67 +519,554 @@ def sync_drives(drive1: str, drive2: str,
     }
 
 
+class _CopySource(NamedTuple):
+    """Fields of a source document that copying and verifying need."""
+    id: int
+    file_path: str
+    md5_hash: str
+    size: int
+    mtime_ns: Optional[int]
+
+
+def _copy_to_drive(executor: ThreadPoolExecutor, docs: Iterable[Document],
+                   drive: str, target_dir: str,
+                   created_dirs: set) -> Tuple[List[str], List[str]]:
+    """
+    Copy documents to a drive, verifying each against its indexed MD5.
+
+    Only a small _CopySource tuple is kept per document while the rows
+    stream in; full rows are reloaded a batch at a time for indexing.
+    Copies run on the executor; indexing stays on the calling thread.
+
+    Args:
+        executor: Pool that runs the copies
+        docs: Documents to copy
+        drive: Target drive letter
+        target_dir: Target directory on the drive ("" keeps the layout)
+        created_dirs: Directories known to exist, shared across the sync
+
+    Returns:
+        Tuple of (verified target paths, error messages)
+    """
+    errors = []
+    targets = {}
+    for doc in docs:
+        try:
+            target_path = _get_target_path(doc.file_path, drive, target_dir)
+        except Exception as e:
+            errors.append(f"Error copying {doc.file_path}: {e}")
+            continue
+        if target_path in targets:
+            # With a flat target_dir, same-named files share a target;
+            # copying both concurrently would interleave their writes
+            errors.append(
+                f"Skipped {targets[target_path].file_path}: "
+                f"{target_path} is also the target of {doc.file_path}"
+            )
+        targets[target_path] = _CopySource(
+            doc.id, doc.file_path, doc.md5_hash, doc.size, doc.mtime_ns
+        )
+
+    for dir_path in {os.path.dirname(target) for target in targets}:
+        try:
+            _ensure_dir(dir_path, created_dirs)
+        except OSError:
+            # Reported per file when the copy fails to open its target
+            pass
+
+    futures = {
+        executor.submit(_copy_one, source, target_path): target_path
+        for target_path, source in targets.items()
+    }
+    copied = []
+    for future in as_completed(futures):
+        target_path = futures[future]
+        error = future.result()
+        if error:
+            errors.append(error)
+            continue
+        copied.append(target_path)
+    _index_copies_by_id(
+        [(target_path, targets[target_path].id) for target_path in copied],
+        errors
+    )
+    return copied, errors
+
+
+def _index_copies_by_id(copies: List[Tuple[str, int]],
+                        errors: List[str]) -> None:
+    """
+    Index copied files, reloading their source rows a batch at a time.
+
+    Args:
+        copies: (target path, source document id) pairs
+        errors: List that indexing failures are appended to
+    """
+    for start in range(0, len(copies), LOAD_BATCH_SIZE):
+        batch = copies[start:start + LOAD_BATCH_SIZE]
+        sources = {
+            doc.id: doc for doc in _iter_documents([i for _, i in batch])
+        }
+        for target_path, source_id in batch:
+            if source_id not in sources:
+                errors.append(f"Error indexing {target_path}: "
+                              "source document no longer indexed")
+        _index_copied_files(
+            [(target_path, sources[source_id])
+             for target_path, source_id in batch if source_id in sources],
+            errors
+        )
+
+
+@functools.lru_cache(maxsize=64)
+def _target_prefix(target_drive: str, target_dir: str) -> str:
+    """Directory that flat copies into target_dir land in."""
+    return str(Path(f"{target_drive}:\\{target_dir}"))
+
+
 def _get_target_path(source_path: str, target_drive: str,
                      target_dir: str) -> str:
     """Generate target path for copied file."""
-    path_obj = Path(source_path)
-
     if target_dir:
-        # Use specified target directory
-        target_dir_path = Path(f"{target_drive}:\\{target_dir}")
-        return str(target_dir_path / path_obj.name)
+        # Use specified target directory; only the file name varies per
+        # call, so the directory part is built once and joined as a string
+        return os.path.join(_target_prefix(target_drive, target_dir),
+                            os.path.basename(source_path))
 
-    # Preserve directory structure on target drive
-    relative_path = path_obj.relative_to(path_obj.drive)
-    return f"{target_drive}:\\{relative_path}"
+    # Preserve directory structure on target drive: only the drive
+    # letter changes ("C:\\a\\b.pdf" -> "D:\\a\\b.pdf")
+    if len(source_path) < 2 or source_path[1] != ':':
+        raise ValueError(f"{source_path} does not start with a drive letter")
+    return target_drive + source_path[1:]
 
 
-def _index_copied_file(file_path: str, source_doc: Document) -> None:
-    """Index a copied file in the database."""
-    from app.file_scanner import index_document
+def _copy_buffer(size: int) -> bytearray:
+    """Return this thread's copy buffer, reallocating only on a size change."""
+    buffer = getattr(_copy_buffers, "buffer", None)
+    if buffer is None or len(buffer) != size:
+        buffer = _copy_buffers.buffer = bytearray(size)
+    return buffer
+
+
+def _copy_with_md5(src: str, dst: str,
+                   bufsize: Optional[int] = None) -> str:
+    """
+    Copy a file and compute its MD5 in the same pass.
+
+    Each chunk read from the source is hashed and written to the target,
+    so verification does not need a second read of the copied file.
+    Metadata is preserved like shutil.copy2.
+
+    Args:
+        src: Source file path
+        dst: Target file path
+        bufsize: Read buffer size (defaults to settings.chunk_size)
+
+    Returns:
+        MD5 hex digest of the bytes written
+
+    Raises:
+        IOError: If the target ends up shorter or longer than the source
+    """
+    md5_hash = hashlib.md5()
+    buffer = _copy_buffer(bufsize or settings.chunk_size)
+    view = memoryview(buffer)
+    fadvise = hasattr(os, "posix_fadvise")  # Not available on Windows
+    with open(src, "rb", buffering=0) as fin, \
+            open(dst, "wb", buffering=0) as fout:
+        if fadvise:
+            # Larger read-ahead window; WILLNEED over the whole file would
+            # pull multi-GB sources into the page cache up front
+            os.posix_fadvise(fin.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        copied = 0
+        while True:
+            read_bytes = fin.readinto(buffer)
+            if not read_bytes:
+                break
+            chunk = view[:read_bytes]
+            md5_hash.update(chunk)
+            # Unbuffered writes may be partial (ENOSPC, SMB/NFS)
+            while chunk:
+                written = fout.write(chunk)
+                if not written:
+                    raise IOError(f"No progress writing {dst}")
+                chunk = chunk[written:]
+            copied += read_bytes
+        source_size = os.fstat(fin.fileno()).st_size
+        target_size = os.fstat(fout.fileno()).st_size
+        if not copied == source_size == target_size:
+            raise IOError(
+                f"Incomplete copy of {src}: {target_size} of "
+                f"{source_size} bytes written"
+            )
+        if fadvise:
+            # Neither file is read again, so hand their pages back instead
+            # of letting a bulk sync push everything else out of the cache
+            os.posix_fadvise(fin.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            os.posix_fadvise(fout.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    shutil.copystat(src, dst)
+    return md5_hash.hexdigest()
+
+
+def _copy_workers() -> int:
+    """Number of threads used for concurrent copies during a sync."""
+    return settings.copy_workers or min(32, (os.cpu_count() or 1) * 2)
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """
+    Clone a file with FICLONE on filesystems that support it (Btrfs, XFS).
+
+    The clone shares the source's blocks, so its content is identical
+    by construction and needs no hashing.
+
+    Args:
+        src: Source file path
+        dst: Target file path
+
+    Returns:
+        True if dst was cloned, False if the caller must copy it
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            devices = (os.fstat(fin.fileno()).st_dev,
+                       os.fstat(fout.fileno()).st_dev)
+            if _reflink_support.get(devices) is False:
+                return False
+            try:
+                fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            except OSError as e:
+                if e.errno in _REFLINK_UNSUPPORTED:
+                    _reflink_support[devices] = False
+                return False
+            _reflink_support[devices] = True
+    except OSError:
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def _copy_file_range(src: str, dst: str) -> bool:
+    """
+    Copy a file with os.copy_file_range (Linux).
+
+    Unlike sendfile, this lets the filesystem do the copy itself:
+    server-side on NFS 4.2 and SMB, shared extents on XFS and Btrfs.
 
-    new_doc = index_document(file_path, extract_text=False)
-    if new_doc and source_doc.extracted_text:
-        # Copy extracted text from source if available
-        db = SessionLocal()
+    Args:
+        src: Source file path
+        dst: Target file path
+
+    Returns:
+        True if dst was copied, False if the caller must copy it
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
         try:
-            new_doc.extracted_text = source_doc.extracted_text
-            db.commit()
-        finally:
-            db.close()
+            while os.copy_file_range(fin.fileno(), fout.fileno(),
+                                     COPY_RANGE_CHUNK):
+                pass
+        except OSError as e:
+            if e.errno in _COPY_RANGE_UNSUPPORTED:
+                # The fallback reopens dst with truncation
+                return False
+            raise
+    shutil.copystat(src, dst)
+    return True
 
 
-def scan_folder(folder_path: str) -> List[str]:
+def _fast_copy(src: str, dst: str) -> None:
     """
-    Scan a specific folder for documents.
+    Copy a file with metadata, letting the kernel move the bytes.
+
+    Reflinks where the filesystem supports it, then copy_file_range;
+    otherwise shutil.copy2, which uses sendfile on Linux and fcopyfile on
+    macOS on its own.
+
+    Args:
+        src: Source file path
+        dst: Target file path
+    """
+    if not _reflink(src, dst) and not _copy_file_range(src, dst):
+        shutil.copy2(src, dst)
+
+
+def _copy_one(doc: Document, target_path: str) -> Optional[str]:
+    """
+    Copy an indexed file and verify it against the indexed MD5.
+
+    Reflinked copies are trusted without hashing while the source still
+    has its indexed size and mtime.
+
+    Runs in a worker thread, so it only touches the filesystem.
+
+    Args:
+        doc: Source document
+        target_path: Destination path (its directory must exist)
+
+    Returns:
+        Error message, or None on success
+    """
+    try:
+        if _reflink(doc.file_path, target_path):
+            stat = os.stat(doc.file_path)
+            if (doc.mtime_ns is not None and stat.st_size == doc.size
+                    and stat.st_mtime_ns == doc.mtime_ns):
+                return None
+            # Modified since it was indexed: the clone may not match the
+            # indexed MD5 that template indexing would store for it
+            new_hash = calculate_md5(target_path)
+        else:
+            # Copy and hash in one pass, then verify against the index
+            new_hash = _copy_with_md5(doc.file_path, target_path)
+    except Exception as e:
+        return f"Error copying {doc.file_path}: {e}"
+    if new_hash != doc.md5_hash:
+        return f"MD5 mismatch for {target_path}"
+    return None
+
+
+def _ensure_dir(dir_path: str, created_dirs: set) -> None:
+    """
+    Create a directory tree unless this sync already created it.
+
+    Ancestors are recorded too, so a later target directly in one of
+    them needs no makedirs call either.
+
+    Args:
+        dir_path: Directory to create
+        created_dirs: Directories known to exist, shared across the sync
+    """
+    if dir_path in created_dirs:
+        return
+    os.makedirs(dir_path, exist_ok=True)
+    while dir_path not in created_dirs:
+        created_dirs.add(dir_path)
+        parent = os.path.dirname(dir_path)
+        if parent == dir_path:
+            break
+        dir_path = parent
+
+
+def _sync_copy_batch(
+    executor: ThreadPoolExecutor,
+    docs: List[Document],
+    src_root: str,
+    dst_root: str,
+    created_dirs: set
+) -> Tuple[List[str], List[str]]:
+    """
+    Copy documents to the same relative paths under another folder.
+
+    Target directories are created once per unique directory, copies run
+    on the executor, and indexing stays on the calling thread.
+
+    Args:
+        executor: Pool that runs the copies
+        docs: Documents to copy
+        src_root: Folder the documents live in
+        dst_root: Folder to copy them into
+        created_dirs: Directories known to exist, shared across the sync
+
+    Returns:
+        Tuple of (copied target paths, error messages)
+    """
+    src_prefix_len = len(_folder_prefix(src_root))
+    targets = [
+        os.path.join(dst_root, doc.file_path[src_prefix_len:])
+        for doc in docs
+    ]
+    for dir_path in {os.path.dirname(target) for target in targets}:
+        try:
+            _ensure_dir(dir_path, created_dirs)
+        except OSError:
+            # Reported per file when the copy fails to open its target
+            pass
     
+    futures = {
+        executor.submit(_copy_one, doc, target): (doc, target)
+        for doc, target in zip(docs, targets)
+    }
+    copies = []
+    errors = []
+    for future in as_completed(futures):
+        doc, target = futures[future]
+        error = future.result()
+        if error:
+            errors.append(error)
+            continue
+        copies.append((target, doc))
+    _index_copied_files(copies, errors)
+    return [target for target, _ in copies], errors
+
+
+def _plan_duplicate(
+    dup_info: Dict,
+    strategy: str,
+    target_folder1: str,
+    target_folder2: str
+) -> Tuple[Optional[Dict], List[Tuple[str, str, int]]]:
+    """
+    Decide how to resolve one same-path, different-content pair.
+
+    Pure planning: no filesystem access.
+
     Args:
-        folder_path: Path to the folder to scan
-        
+        dup_info: Entry from analyze_folder_sync()["duplicates"]
+        strategy: "keep_both", "keep_newest" or "keep_largest"
+        target_folder1: Target folder for files from folder2
+        target_folder2: Target folder for files from folder1
+
     Returns:
-        List of file paths found
+        Tuple of (resolution record, copy operations). Each operation is
+        (source path, target path, destination folder number 1 or 2).
     """
-    from app.config import settings
+    rel_path = dup_info["relative_path"]
+    doc1 = dup_info["folder1_docs"][0]  # Take first doc from each
+    doc2 = dup_info["folder2_docs"][0]
+    
+    if strategy == "keep_both":
+        # Keep both - copy each version to the opposite folder with suffix
+        target1 = os.path.join(target_folder1, f"{rel_path}.folder2")
+        target2 = os.path.join(target_folder2, f"{rel_path}.folder1")
+        return {
+            "relative_path": rel_path,
+            "action": "keep_both",
+            "folder1_copy": target1,
+            "folder2_copy": target2
+        }, [(doc2.file_path, target1, 1), (doc1.file_path, target2, 2)]
+    
+    if strategy == "keep_newest":
+        # Keep the newest file
+        date1 = doc1.date_created or _EPOCH
+        date2 = doc2.date_created or _EPOCH
+        keep_folder2 = date2 > date1
+    elif strategy == "keep_largest":
+        # Keep the largest file
+        keep_folder2 = doc2.size > doc1.size
+    else:
+        return None, []
     
+    if keep_folder2:
+        # Keep folder2 version, copy to folder1
+        target = os.path.join(target_folder1, rel_path)
+        op = (doc2.file_path, target, 1)
+        side = "folder2"
+    else:
+        # Keep folder1 version, copy to folder2
+        target = os.path.join(target_folder2, rel_path)
+        op = (doc1.file_path, target, 2)
+        side = "folder1"
+    return {
+        "relative_path": rel_path,
+        "action": f"{strategy}_{side}",
+        "target": target
+    }, [op]
+
+
+def _copy_plain(src: str, dst: str, created_dirs: set) -> Optional[str]:
+    """
+    Copy a file with metadata in a worker thread.
+
+    Args:
+        src: Source file path
+        dst: Target file path
+        created_dirs: Directories known to exist, shared across the sync
+
+    Returns:
+        Error message, or None on success
+    """
+    try:
+        _ensure_dir(os.path.dirname(dst), created_dirs)
+        _fast_copy(src, dst)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def _index_copied_file(file_path: str, source_doc: Document) -> None:
+    """Index a copied file in the database from its source document."""
+    index_document_from_template(file_path, source_doc)
+
+
+def _index_copied_files(copies: List[Tuple[str, Document]],
+                        errors: List[str]) -> None:
+    """
+    Index copied files from their source documents in one transaction.
+
+    Args:
+        copies: (target path, source document) pairs
+        errors: List that indexing failures are appended to
+    """
+    if copies:
+        index_documents_from_templates(copies, errors)
+
+
+def scan_folder_stats(folder_path: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Scan a folder for documents, collecting size and mtime on the way.
+
+    Uses os.scandir, whose entries carry the stat data from the
+    directory listing on Windows, so no separate stat call per file
+    is needed to check files against the index.
+
+    Args:
+        folder_path: Path to the folder to scan
+
+    Returns:
+        Dictionary mapping file path to (size, mtime_ns)
+    """
     folder_path = os.path.abspath(folder_path)
     if not os.path.exists(folder_path):
         raise ValueError(f"Folder {folder_path} does not exist")
+
+    found_files = {}
+    file_extensions = _extension_set()
+    pending = [folder_path]
+
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            # Unreadable directory; os.walk skipped these silently too
+            continue
+        with entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir():
+                        # Skip hidden directories; like os.walk, do not
+                        # descend into symlinked ones
+                        if not name.startswith('.') and not entry.is_symlink():
+                            pending.append(entry.path)
+                        continue
+                    # Extension lookup on the bare name before any stat
+                    dot = name.rfind('.')
+                    if dot > 0 and name[dot:].lower() in file_extensions:
+                        stat_info = entry.stat()
+                        found_files[entry.path] = (stat_info.st_size,
+                                                   stat_info.st_mtime_ns)
+                except OSError:
+                    # Vanished or broken link; it could not be indexed anyway
+                    continue
+
+    return found_files
+
+
+def scan_folder(folder_path: str) -> List[str]:
+    """
+    Scan a specific folder for documents.
     
-    found_files = []
-    file_extensions = settings.supported_extensions
-    
-    for root, dirs, files in os.walk(folder_path):
-        # Skip hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
+    Args:
+        folder_path: Path to the folder to scan
         
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            if file_ext in file_extensions:
-                found_files.append(file_path)
-    
-    return found_files
+    Returns:
+        List of file paths found
+    """
+    return list(scan_folder_stats(folder_path))
 
 
 def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> Dict:
@@ -386,8 +1080,6 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
     Returns:
         Dictionary with sync analysis information
     """
-    from app.file_scanner import index_document
-    
     folder1 = os.path.abspath(folder1)
     folder2 = os.path.abspath(folder2)
     
@@ -408,13 +1100,14 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         scanned_indexed: int = 0
         equals_count: int = 0
         needs_sync_count: int = 0
-        last_emit_time: float = time.time() - 1.0  # Start 1 second ago so first emit happens immediately
+        last_emit_time: float = float("-inf")  # First emit happens immediately
 
         def emit_progress(phase: str, extra: Optional[Dict] = None, force: bool = False) -> None:
             nonlocal last_emit_time
             if not progress_callback:
                 return
-            now = time.time()
+            # Monotonic, so clock adjustments cannot stall or flood updates
+            now = time.monotonic()
             # Emit at least every 1 second, or immediately if forced
             # Force is used when we increment equals_count or needs_sync_count
             if force or now - last_emit_time >= 1.0:
@@ -458,8 +1151,8 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
             
             # Get all documents in both folders
             docs_to_cleanup = db.query(Document).filter(
-                (Document.file_path.like(f"{folder1_normalized}%")) |
-                (Document.file_path.like(f"{folder2_normalized}%"))
+                _under_folder(folder1_normalized) |
+                _under_folder(folder2_normalized)
             ).all()
             
             # Remove database entries for files that no longer exist on disk
@@ -491,9 +1184,19 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         except Exception as e:
             # Silently handle database errors - don't show to user
             # Log but don't fail the analysis
-            import logging
             logging.warning(f"Database cleanup error during folder scan: {str(e)}")
         
+        # Size and mtime of already indexed files; files whose stat still
+        # matches are skipped instead of being re-hashed
+        known_files = {
+            file_path: (size, mtime_ns)
+            for file_path, size, mtime_ns in db.query(
+                Document.file_path, Document.size, Document.mtime_ns
+            ).filter(
+                _under_folder(folder1) | _under_folder(folder2)
+            )
+        }
+
         # Scan folder1 and index/update files
         try:
             if progress_callback:
@@ -503,24 +1206,47 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
                     "total": 100,
                     "percentage": 0
                 })
-            files1 = scan_folder(folder1)
+            files1 = scan_folder_stats(folder1)
             print(f"[DEBUG] Found {len(files1)} files in folder1")
+            # Hash only new or modified files, the whole batch up front so
+            # MD5 runs on every core
+            changed1 = [
+                p for p, stat_key in files1.items()
+                if known_files.get(p) != stat_key
+            ]
+            md5_by_path = hash_files(changed1)
+            # One transaction for every new or modified file; a file that
+            # fails to index is skipped, as with per-file indexing
+            index_errors = []
+            index_documents(md5_by_path, index_errors)
+            for error in index_errors:
+                logging.warning(error)
             for idx, file_path in enumerate(files1):
-                doc = index_document(file_path, extract_text=False)
                 scanned_indexed += 1
-                # Show progress every 10 files (more frequent)
-                if idx % 10 == 0 or idx == len(files1) - 1:
-                    file_info = f"Indexing {os.path.basename(file_path)}..."
-                    if doc and doc.md5_hash:
-                        file_info += f" MD5: {doc.md5_hash[:16]}..."
-                    emit_progress("scan_folder1", {
+                # Show progress every 10 files (more frequent); the
+                # message is only built for files that may be shown
+                if progress_callback and (
+                    idx % 10 == 0 or idx == len(files1) - 1
+                ):
+                    if file_path in md5_by_path:
+                        phase = "scan_folder1"
+                        file_info = f"Indexing {os.path.basename(file_path)}..."
+                        if md5_by_path[file_path]:
+                            file_info += f" MD5: {md5_by_path[file_path][:16]}..."
+                    else:
+                        phase = "cached"
+                        file_info = f"Unchanged {os.path.basename(file_path)} (cached)"
+                    emit_progress(phase, {
                         "file": file_info,
                         "progress": idx + 1,
                         "total": len(files1),
                         "percentage": int(((idx + 1) / len(files1)) * 100) if len(files1) > 0 else 0
                     })
             # Emit final count after folder1 scan
-            print(f"[DEBUG] Folder1 scan complete: scanned_indexed={scanned_indexed}")
+            print(
+                f"[DEBUG] Folder1 scan complete: scanned_indexed={scanned_indexed} "
+                f"hashed={len(changed1)}"
+            )
             emit_progress("scan_folder1", {"file": f"Completed scanning {folder1}"})
             # Refresh session to see newly indexed files
             db.expire_all()
@@ -536,24 +1262,47 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
                     "total": 100,
                     "percentage": 0
                 })
-            files2 = scan_folder(folder2)
+            files2 = scan_folder_stats(folder2)
             print(f"[DEBUG] Found {len(files2)} files in folder2")
+            # Hash only new or modified files, the whole batch up front so
+            # MD5 runs on every core
+            changed2 = [
+                p for p, stat_key in files2.items()
+                if known_files.get(p) != stat_key
+            ]
+            md5_by_path = hash_files(changed2)
+            # One transaction for every new or modified file; a file that
+            # fails to index is skipped, as with per-file indexing
+            index_errors = []
+            index_documents(md5_by_path, index_errors)
+            for error in index_errors:
+                logging.warning(error)
             for idx, file_path in enumerate(files2):
-                doc = index_document(file_path, extract_text=False)
                 scanned_indexed += 1
-                # Show progress every 10 files (more frequent)
-                if idx % 10 == 0 or idx == len(files2) - 1:
-                    file_info = f"Indexing {os.path.basename(file_path)}..."
-                    if doc and doc.md5_hash:
-                        file_info += f" MD5: {doc.md5_hash[:16]}..."
-                    emit_progress("scan_folder2", {
+                # Show progress every 10 files (more frequent); the
+                # message is only built for files that may be shown
+                if progress_callback and (
+                    idx % 10 == 0 or idx == len(files2) - 1
+                ):
+                    if file_path in md5_by_path:
+                        phase = "scan_folder2"
+                        file_info = f"Indexing {os.path.basename(file_path)}..."
+                        if md5_by_path[file_path]:
+                            file_info += f" MD5: {md5_by_path[file_path][:16]}..."
+                    else:
+                        phase = "cached"
+                        file_info = f"Unchanged {os.path.basename(file_path)} (cached)"
+                    emit_progress(phase, {
                         "file": file_info,
                         "progress": idx + 1,
                         "total": len(files2),
                         "percentage": int(((idx + 1) / len(files2)) * 100) if len(files2) > 0 else 0
                     })
             # Emit final count after folder2 scan
-            print(f"[DEBUG] Folder2 scan complete: scanned_indexed={scanned_indexed}")
+            print(
+                f"[DEBUG] Folder2 scan complete: scanned_indexed={scanned_indexed} "
+                f"hashed={len(changed2)}"
+            )
             emit_progress("scan_folder2", {"file": f"Completed scanning {folder2}"})
             # Refresh session to see newly indexed files
             db.expire_all()
@@ -571,12 +1320,12 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
             folder2_normalized = folder2_normalized[0].upper() + folder2_normalized[1:]
         
         docs_folder1_all = db.query(Document).filter(
-            Document.file_path.like(f"{folder1_normalized}%")
+            _under_folder(folder1_normalized)
         ).all()
         
         # Get documents from folder2 (after refresh)
         docs_folder2_all = db.query(Document).filter(
-            Document.file_path.like(f"{folder2_normalized}%")
+            _under_folder(folder2_normalized)
         ).all()
         
         # Final cleanup: Remove database entries for files that no longer exist on disk
@@ -601,7 +1350,6 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
                 except Exception:
                     pass
                 # Silently handle database errors - don't show to user
-                import logging
                 logging.warning(f"Database cleanup error: {str(e)}")
         
         # Filter out documents for files that no longer exist on disk
@@ -612,40 +1360,25 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         # Group by relative path (preserving tree structure) and MD5
         # Matching rule: files match if relative path is the same and MD5 is the same
         # This ensures subfolder1\file.pdf in folder1 matches subfolder1\file.pdf in folder2
-        folder1_dict = {}  # {relative_path: [docs]}
-        folder2_dict = {}
+        folder1_dict = defaultdict(list)  # {relative_path: [docs]}
+        folder2_dict = defaultdict(list)
         
-        # Helper function to get relative path from base folder
-        def get_relative_path(file_path: str, base_folder: str) -> str:
-            """Get relative path from base folder, normalizing separators."""
-            try:
-                # Normalize paths for comparison
-                file_path_norm = os.path.normpath(file_path)
-                base_folder_norm = os.path.normpath(base_folder)
-                
-                # Get relative path
-                rel_path = os.path.relpath(file_path_norm, base_folder_norm)
-                
-                # Normalize to use backslashes on Windows for consistency
-                if os.sep != '\\':
-                    rel_path = rel_path.replace(os.sep, '\\')
-                
-                return rel_path
-            except ValueError:
-                # If files are on different drives, fall back to basename
-                return os.path.basename(file_path)
+        # Documents come from the _under_folder() filter, so every path
+        # starts with the folder prefix and a slice gives its relative path
+        prefix1 = _folder_prefix(folder1)
+        prefix2 = _folder_prefix(folder2)
         
         # Track progress for folder1
         total_files_folder1 = len(docs_folder1)
         for idx, doc in enumerate(docs_folder1):
             try:
                 # Use relative path instead of just basename
-                rel_path = get_relative_path(doc.file_path, folder1)
+                rel_path = _relative_path(doc.file_path, prefix1)
+                if rel_path is None:
+                    continue
                 # Debug for target file
                 if "Indexing R for Data Science" in rel_path or "R for Data Science" in rel_path:
                     print(f"[DEBUG TARGET] folder1 grouping: file_path='{doc.file_path}' rel_path='{rel_path}'")
-                if rel_path not in folder1_dict:
-                    folder1_dict[rel_path] = []
                 folder1_dict[rel_path].append(doc)
             except ValueError:
                 continue
@@ -655,12 +1388,12 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         for idx, doc in enumerate(docs_folder2):
             try:
                 # Use relative path instead of just basename
-                rel_path = get_relative_path(doc.file_path, folder2)
+                rel_path = _relative_path(doc.file_path, prefix2)
+                if rel_path is None:
+                    continue
                 # Debug for target file
                 if "Indexing R for Data Science" in rel_path or "R for Data Science" in rel_path:
                     print(f"[DEBUG TARGET] folder2 grouping: file_path='{doc.file_path}' rel_path='{rel_path}'")
-                if rel_path not in folder2_dict:
-                    folder2_dict[rel_path] = []
                 folder2_dict[rel_path].append(doc)
             except ValueError:
                 continue
@@ -668,6 +1401,8 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         # Find files unique to each folder and duplicates with different content
         missing_in_folder2 = []  # Files in folder1 but not folder2
         missing_in_folder1 = []  # Files in folder2 but not folder1
+        space_needed_folder1 = 0  # Bytes of missing_in_folder1
+        space_needed_folder2 = 0  # Bytes of missing_in_folder2
         duplicates = []  # Same name, different MD5 (partial matches needing decision)
         suspected_duplicates = []  # Different name, same MD5 (possible rename)
 
@@ -679,15 +1414,13 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         
         # Compare by relative path and track progress
         compared_count = 0
-        # Deterministic order: sort by relative path
-        rel_paths_all = sorted(set(folder1_dict.keys()) | set(folder2_dict.keys()))
+        # Walk relative paths in sorted order: missing_in_folder1/2 and
+        # duplicates are built in this order, and callers display (and
+        # truncate) them as returned
+        rel_paths_all = sorted(folder1_dict.keys() | folder2_dict.keys())
         total_to_compare = len(rel_paths_all)
 
-        # Build quick MD5 presence sets per folder for cross-name checks
-        md5_set_f1 = set()
-        for docs in folder1_dict.values():
-            for d in docs:
-                md5_set_f1.add(d.md5_hash)
+        # Build quick MD5 presence set of folder2 for cross-name checks
         md5_set_f2 = set()
         for docs in folder2_dict.values():
             for d in docs:
@@ -696,22 +1429,46 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
         # Determine debug throttling to <= 50 messages based on bigger folder size
         bigger_folder_files = max(total_files_folder1, total_files_folder2)
         compare_log_step = max(1, int(math.ceil(bigger_folder_files / 50)))
-        try:
-            print(
-                f"[DEBUG] ordered {len(folder1_dict)} files in folder1, ordered {len(folder2_dict)} files in folder2; "
-                f"bigger_folder_files={bigger_folder_files}, log_step={compare_log_step}"
+        # Checked once so disabled debug output costs nothing per file
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug(
+                "ordered %d files in folder1, ordered %d files in folder2; "
+                "bigger_folder_files=%d, log_step=%d",
+                len(folder1_dict), len(folder2_dict),
+                bigger_folder_files, compare_log_step
             )
-        except Exception:
-            pass
 
         # Track how many pairs we matched by name for each md5 so we can
         # later also match by md5 across different names without double-counting
         matched_by_name_per_md5 = {}
+        last_compare_emit = float("-inf")  # First comparison always emits
+        # Per-folder MD5 occurrence counts and relative paths, gathered
+        # during the compare pass for the suspected-duplicates scan below
+        md5_counts_f1 = Counter()
+        md5_counts_f2 = Counter()
+        rel_paths_by_md5_f1 = defaultdict(set)
+        rel_paths_by_md5_f2 = defaultdict(set)
 
         for rel_path in rel_paths_all:
             docs1_list = folder1_dict.get(rel_path, [])
             docs2_list = folder2_dict.get(rel_path, [])
             compared_count += 1
+            # Rate-limit per-file progress; the file info string is only
+            # built for iterations that are actually emitted
+            now = time.monotonic()
+            emit_compare = bool(progress_callback) and (
+                now - last_compare_emit >= COMPARE_EMIT_INTERVAL
+                or compared_count == total_to_compare
+            )
+            if emit_compare:
+                last_compare_emit = now
+            for d in docs1_list:
+                md5_counts_f1[d.md5_hash] += 1
+                rel_paths_by_md5_f1[d.md5_hash].add(rel_path)
+            for d in docs2_list:
+                md5_counts_f2[d.md5_hash] += 1
+                rel_paths_by_md5_f2[d.md5_hash].add(rel_path)
 
             # Special debug for the specific file mentioned by user
             is_target_file = "Indexing R for Data Science" in rel_path or "R for Data Science" in rel_path
@@ -730,147 +1487,113 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
 
             if not docs2_list:
                 # Files with this relative path only in folder1
+                log_this = is_target_file or (debug_enabled and (
+                    (compared_count % compare_log_step == 0)
+                    or (compared_count == total_to_compare)
+                ))
+                # MD5 cross-check for the debug output, evaluated once as a
+                # set operation and only when something is logged
+                md5_cross = log_this and not md5_set_f2.isdisjoint(
+                    {d.md5_hash for d in docs1_list}
+                )
                 if is_target_file:
                     print(f"[DEBUG TARGET] File '{rel_path}' NOT found in folder2 by relative path")
-                    any_md5_matches = any(d.md5_hash in md5_set_f2 for d in docs1_list)
-                    print(f"[DEBUG TARGET] MD5 matches in folder2: {any_md5_matches}")
+                    print(f"[DEBUG TARGET] MD5 matches in folder2: {md5_cross}")
                     if docs1_list:
                         for d in docs1_list:
                             print(f"[DEBUG TARGET] Checking MD5 {d.md5_hash[:16]}... in folder2 set: {d.md5_hash in md5_set_f2}")
                 
                 missing_in_folder2.extend(docs1_list)
+                for d in docs1_list:
+                    space_needed_folder2 += d.size
                 uniques_count += len(docs1_list)
                 needs_sync_count += len(docs1_list)
                 # Debug
-                if (compared_count % compare_log_step == 0) or (compared_count == total_to_compare) or is_target_file:
-                    try:
-                        any_md5_matches = any(d.md5_hash in md5_set_f2 for d in docs1_list)
-                        if any_md5_matches:
-                            # Case 3
-                            print(
-                                f"[DEBUG] file {rel_path} does NOT have an EXACT match in folder2 by relative path "
-                                f"BUT MATCHED by MD5 so it PROBABLY DOES NOT need sync, it needs MERGE."
-                            )
-                        else:
-                            # Case 1
-                            print(
-                                f"[DEBUG] file {rel_path} does not have a match in folder2 by relative path and by md5 "
-                                f"so it needs sync."
-                            )
-                    except Exception:
-                        pass
-                # Build file info with size, dates, and MD5 for progress display
-                file_info_parts = []
-                if docs1_list:
-                    # Show info for first file (or aggregate if multiple)
-                    if len(docs1_list) == 1:
-                        file_info_parts.append(f"folder1: {format_file_info(docs1_list[0])}")
-                    else:
-                        file_info_parts.append(
-                            f"{rel_path} | folder1: {len(docs1_list)} files"
+                if log_this:
+                    if md5_cross:
+                        # Case 3
+                        logger.debug(
+                            "file %s does NOT have an EXACT match in folder2 by relative path "
+                            "BUT MATCHED by MD5 so it PROBABLY DOES NOT need sync, it needs MERGE.",
+                            rel_path
                         )
-                        # Show first file's details
-                        file_info_parts.append(
-                            f"  First: {format_file_info(docs1_list[0])}"
+                    else:
+                        # Case 1
+                        logger.debug(
+                            "file %s does not have a match in folder2 by relative path and by md5 "
+                            "so it needs sync.",
+                            rel_path
                         )
-                file_info = " | ".join(file_info_parts) if file_info_parts else rel_path
-                emit_progress("compare", {
-                    "file": file_info,
-                    "scanned": equals_by_name_count + uniques_count,
-                    "equals": equals_by_name_count,
-                    "needs_sync": uniques_count,
-                }, force=True)
+                if emit_compare:
+                    # Build file info with size, dates, and MD5 for progress display
+                    file_info_parts = []
+                    if docs1_list:
+                        # Show info for first file (or aggregate if multiple)
+                        if len(docs1_list) == 1:
+                            file_info_parts.append(f"folder1: {format_file_info(docs1_list[0])}")
+                        else:
+                            file_info_parts.append(
+                                f"{rel_path} | folder1: {len(docs1_list)} files"
+                            )
+                            # Show first file's details
+                            file_info_parts.append(
+                                f"  First: {format_file_info(docs1_list[0])}"
+                            )
+                    file_info = " | ".join(file_info_parts) if file_info_parts else rel_path
+                    emit_progress("compare", {
+                        "file": file_info,
+                        "scanned": equals_by_name_count + uniques_count,
+                        "equals": equals_by_name_count,
+                        "needs_sync": uniques_count,
+                    }, force=True)
             elif not docs1_list:
                 # Files with this relative path only in folder2
                 missing_in_folder1.extend(docs2_list)
+                for d in docs2_list:
+                    space_needed_folder1 += d.size
                 uniques_count += len(docs2_list)
                 needs_sync_count += len(docs2_list)
                 # Debug
-                if (compared_count % compare_log_step == 0) or (compared_count == total_to_compare):
-                    try:
-                        print(f"[DEBUG] relative-path-only in folder2: '{rel_path}' count2={len(docs2_list)}")
-                    except Exception:
-                        pass
-                # Build file info with size, dates, and MD5 for progress display
-                file_info_parts = []
-                if docs2_list:
-                    # Show info for first file (or aggregate if multiple)
-                    if len(docs2_list) == 1:
-                        file_info_parts.append(f"folder2: {format_file_info(docs2_list[0])}")
-                    else:
-                        file_info_parts.append(
-                            f"{rel_path} | folder2: {len(docs2_list)} files"
-                        )
-                        # Show first file's details
-                        file_info_parts.append(
-                            f"  First: {format_file_info(docs2_list[0])}"
-                        )
-                file_info = " | ".join(file_info_parts) if file_info_parts else rel_path
-                emit_progress("compare", {
-                    "file": file_info,
-                    "scanned": equals_by_name_count + uniques_count,
-                    "equals": equals_by_name_count,
-                    "needs_sync": uniques_count,
-                }, force=True)
+                if debug_enabled and (
+                    (compared_count % compare_log_step == 0)
+                    or (compared_count == total_to_compare)
+                ):
+                    logger.debug("relative-path-only in folder2: '%s' count2=%d",
+                                 rel_path, len(docs2_list))
+                if emit_compare:
+                    # Build file info with size, dates, and MD5 for progress display
+                    file_info_parts = []
+                    if docs2_list:
+                        # Show info for first file (or aggregate if multiple)
+                        if len(docs2_list) == 1:
+                            file_info_parts.append(f"folder2: {format_file_info(docs2_list[0])}")
+                        else:
+                            file_info_parts.append(
+                                f"{rel_path} | folder2: {len(docs2_list)} files"
+                            )
+                            # Show first file's details
+                            file_info_parts.append(
+                                f"  First: {format_file_info(docs2_list[0])}"
+                            )
+                    file_info = " | ".join(file_info_parts) if file_info_parts else rel_path
+                    emit_progress("compare", {
+                        "file": file_info,
+                        "scanned": equals_by_name_count + uniques_count,
+                        "equals": equals_by_name_count,
+                        "needs_sync": uniques_count,
+                    }, force=True)
             else:
                 # Same relative path exists on both sides
                 # Match files first by relative path (already grouped), then by MD5
                 
-                # Step 1: Match files by MD5 within the same relative path
-                # Group files by MD5 for both folders
-                f1_by_md5 = {}  # {md5: [docs]}
-                f2_by_md5 = {}  # {md5: [docs]}
-                
-                for d in docs1_list:
-                    if d.md5_hash not in f1_by_md5:
-                        f1_by_md5[d.md5_hash] = []
-                    f1_by_md5[d.md5_hash].append(d)
-                
-                for d in docs2_list:
-                    if d.md5_hash not in f2_by_md5:
-                        f2_by_md5[d.md5_hash] = []
-                    f2_by_md5[d.md5_hash].append(d)
-                
-                if is_target_file:
-                    print(f"[DEBUG TARGET] folder1 MD5 groups: {list(f1_by_md5.keys())}")
-                    print(f"[DEBUG TARGET] folder2 MD5 groups: {list(f2_by_md5.keys())}")
-                
-                # Step 2: Match pairs by MD5 (same relative path + same MD5)
-                exact_here = 0
-                matched_pairs = []  # Track matched pairs for debugging
-                unmatched_f1 = []  # Files from folder1 that weren't matched
-                unmatched_f2 = []  # Files from folder2 that weren't matched
-                
-                # For each MD5 that exists in both folders, match the files
-                for md5_hash in set(f1_by_md5.keys()) & set(f2_by_md5.keys()):
-                    # Match pairs: take minimum count from both sides
-                    pairs_count = min(len(f1_by_md5[md5_hash]), 
-                                      len(f2_by_md5[md5_hash]))
-                    exact_here += pairs_count
-                    matched_by_name_per_md5[md5_hash] = matched_by_name_per_md5.get(md5_hash, 0) + pairs_count
-                    
-                    # Mark matched files
-                    for i in range(pairs_count):
-                        matched_pairs.append({
-                            "folder1": f1_by_md5[md5_hash][i],
-                            "folder2": f2_by_md5[md5_hash][i],
-                            "md5": md5_hash
-                        })
-                    
-                    # Track unmatched files
-                    if len(f1_by_md5[md5_hash]) > pairs_count:
-                        unmatched_f1.extend(f1_by_md5[md5_hash][pairs_count:])
-                    if len(f2_by_md5[md5_hash]) > pairs_count:
-                        unmatched_f2.extend(f2_by_md5[md5_hash][pairs_count:])
-                
-                # Step 3: Collect unmatched files (same relative path, different MD5)
-                for md5_hash in f1_by_md5.keys():
-                    if md5_hash not in f2_by_md5:
-                        unmatched_f1.extend(f1_by_md5[md5_hash])
-                
-                for md5_hash in f2_by_md5.keys():
-                    if md5_hash not in f1_by_md5:
-                        unmatched_f2.extend(f2_by_md5[md5_hash])
+                # Match pairs by MD5 (same relative path + same MD5)
+                matched_pairs, unmatched_f1, unmatched_f2 = _match_by_md5(
+                    docs1_list, docs2_list
+                )
+                exact_here = len(matched_pairs)
+                for pair in matched_pairs:
+                    md5_hash = pair["md5"]
+                    matched_by_name_per_md5[md5_hash] = matched_by_name_per_md5.get(md5_hash, 0) + 1
                 
                 if is_target_file:
                     print(f"[DEBUG TARGET] exact_here (matched pairs): {exact_here}")
@@ -900,115 +1623,109 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
 
                 scanned_disp = equals_by_name_count + uniques_count
                 needs_disp = uniques_count
-                if (compared_count % compare_log_step == 0) or (compared_count == total_to_compare):
-                    try:
-                        # Case 2: exact match by relative path and md5
-                        if exact_here > 0:
-                            print(
-                                f"[DEBUG] file {rel_path} does have a match in folder2 by relative path and by md5 "
-                                f"so it DOES NOT need sync."
-                            )
-                        # Case 3: no exact by relative path, but md5 exists elsewhere on folder2
-                        elif any(d.md5_hash in md5_set_f2 for d in docs1_list):
-                            print(
-                                f"[DEBUG] file {rel_path} does NOT have an EXACT match in folder2 by relative path "
-                                f"BUT MATCHED by MD5 so it PROBABLY DOES NOT need sync, it needs MERGE."
-                            )
-                        else:
-                            # Case 1 fallback
-                            print(
-                                f"[DEBUG] file {rel_path} does not have a match in folder2 by relative path and by md5 "
-                                f"so it needs sync."
-                            )
-                    except Exception:
-                        pass
-                # Build file info with size, dates, and MD5 for unmatched files
-                file_info_parts = [f"{rel_path}"]
-                
-                # Show info for unmatched files that need sync
-                if unmatched_f1:
-                    if len(unmatched_f1) == 1:
-                        file_info_parts.append(
-                            f"folder1 (needs sync): {format_file_info(unmatched_f1[0])}"
+                if debug_enabled and (
+                    (compared_count % compare_log_step == 0)
+                    or (compared_count == total_to_compare)
+                ):
+                    # Case 2: exact match by relative path and md5
+                    if exact_here > 0:
+                        logger.debug(
+                            "file %s does have a match in folder2 by relative path and by md5 "
+                            "so it DOES NOT need sync.",
+                            rel_path
+                        )
+                    # Case 3: no exact by relative path, but md5 exists elsewhere on folder2
+                    elif not md5_set_f2.isdisjoint(
+                        {d.md5_hash for d in docs1_list}
+                    ):
+                        logger.debug(
+                            "file %s does NOT have an EXACT match in folder2 by relative path "
+                            "BUT MATCHED by MD5 so it PROBABLY DOES NOT need sync, it needs MERGE.",
+                            rel_path
                         )
                     else:
-                        file_info_parts.append(
-                            f"folder1: {len(unmatched_f1)} files need sync"
+                        # Case 1 fallback
+                        logger.debug(
+                            "file %s does not have a match in folder2 by relative path and by md5 "
+                            "so it needs sync.",
+                            rel_path
                         )
-                        if unmatched_f1:
+                if emit_compare:
+                    # Build file info with size, dates, and MD5 for unmatched files
+                    file_info_parts = [f"{rel_path}"]
+                
+                    # Show info for unmatched files that need sync
+                    if unmatched_f1:
+                        if len(unmatched_f1) == 1:
+                            file_info_parts.append(
+                                f"folder1 (needs sync): {format_file_info(unmatched_f1[0])}"
+                            )
+                        else:
                             file_info_parts.append(
-                                f"  First: {format_file_info(unmatched_f1[0])}"
+                                f"folder1: {len(unmatched_f1)} files need sync"
                             )
+                            if unmatched_f1:
+                                file_info_parts.append(
+                                    f"  First: {format_file_info(unmatched_f1[0])}"
+                                )
                 
-                if unmatched_f2:
-                    if len(unmatched_f2) == 1:
-                        file_info_parts.append(
-                            f"folder2 (needs sync): {format_file_info(unmatched_f2[0])}"
-                        )
-                    else:
-                        file_info_parts.append(
-                            f"folder2: {len(unmatched_f2)} files need sync"
-                        )
-                        if unmatched_f2:
+                    if unmatched_f2:
+                        if len(unmatched_f2) == 1:
                             file_info_parts.append(
-                                f"  First: {format_file_info(unmatched_f2[0])}"
+                                f"folder2 (needs sync): {format_file_info(unmatched_f2[0])}"
                             )
+                        else:
+                            file_info_parts.append(
+                                f"folder2: {len(unmatched_f2)} files need sync"
+                            )
+                            if unmatched_f2:
+                                file_info_parts.append(
+                                    f"  First: {format_file_info(unmatched_f2[0])}"
+                                )
                 
-                # If no unmatched files, show matched info
-                if not unmatched_f1 and not unmatched_f2 and exact_here > 0:
-                    file_info_parts.append(f"✓ {exact_here} exact match(es) - no sync needed")
+                    # If no unmatched files, show matched info
+                    if not unmatched_f1 and not unmatched_f2 and exact_here > 0:
+                        file_info_parts.append(f"✓ {exact_here} exact match(es) - no sync needed")
                 
-                file_info = " | ".join(file_info_parts)
-                emit_progress("compare", {
-                    "file": file_info,
-                    "scanned": scanned_disp,
-                    "equals": equals_by_name_count,
-                    "needs_sync": needs_disp,
-                }, force=True)
+                    file_info = " | ".join(file_info_parts)
+                    emit_progress("compare", {
+                        "file": file_info,
+                        "scanned": scanned_disp,
+                        "equals": equals_by_name_count,
+                        "needs_sync": needs_disp,
+                    }, force=True)
 
         # MD5-only suspected duplicates across different relative paths
-        md5_counts_f1 = {}
-        rel_paths_by_md5_f1 = {}
-        for rel_path, docs in folder1_dict.items():
-            for d in docs:
-                md5_counts_f1[d.md5_hash] = md5_counts_f1.get(d.md5_hash, 0) + 1
-                rel_paths_by_md5_f1.setdefault(d.md5_hash, set()).add(rel_path)
-        md5_counts_f2 = {}
-        rel_paths_by_md5_f2 = {}
-        for rel_path, docs in folder2_dict.items():
-            for d in docs:
-                md5_counts_f2[d.md5_hash] = md5_counts_f2.get(d.md5_hash, 0) + 1
-                rel_paths_by_md5_f2.setdefault(d.md5_hash, set()).add(rel_path)
-
         suspected_count = 0
-        for h in set(md5_counts_f1.keys()) & set(md5_counts_f2.keys()):
+        # Probe the larger key set with the smaller one
+        smaller, larger = sorted((md5_counts_f1, md5_counts_f2), key=len)
+        for h in smaller:
+            if h not in larger:
+                continue
             # Skip MD5s that were already paired by same relative path for all occurrences
             total_pairs_possible = min(md5_counts_f1[h], md5_counts_f2[h])
             already_by_rel_path = matched_by_name_per_md5.get(h, 0)
             remaining = max(0, total_pairs_possible - already_by_rel_path)
             if remaining <= 0:
                 continue
-            rel_paths1 = rel_paths_by_md5_f1.get(h, set())
-            rel_paths2 = rel_paths_by_md5_f2.get(h, set())
+            rel_paths1 = rel_paths_by_md5_f1[h]
+            rel_paths2 = rel_paths_by_md5_f2[h]
             # Only suspect if relative paths do not intersect (i.e., different relative paths)
             if rel_paths1.isdisjoint(rel_paths2):
                 suspected_duplicates.append({
                     "md5": h,
-                    "folder1_rel_paths": sorted(list(rel_paths1)),
-                    "folder2_rel_paths": sorted(list(rel_paths2)),
+                    "folder1_rel_paths": _sorted_paths(rel_paths1),
+                    "folder2_rel_paths": _sorted_paths(rel_paths2),
                     "count_pairs": remaining,
                 })
                 suspected_count += remaining
 
         scanned_disp = equals_by_name_count + uniques_count + suspected_count
         needs_disp = uniques_count + suspected_count
-        try:
-            print(
-                f"[DEBUG] suspected md5 duplicates across names: {suspected_count} "
-                f"equals={equals_by_name_count} needs={needs_disp} scanned={scanned_disp}"
-            )
-        except Exception:
-            pass
+        logger.debug(
+            "suspected md5 duplicates across names: %d equals=%d needs=%d scanned=%d",
+            suspected_count, equals_by_name_count, needs_disp, scanned_disp
+        )
         emit_progress("compare", {
             "file": "Comparison completed",
             "scanned": scanned_disp,
@@ -1029,8 +1746,8 @@ def analyze_folder_sync(folder1: str, folder2: str, progress_callback=None) -> D
             "missing_count_folder1": len(missing_in_folder1),
             "missing_count_folder2": len(missing_in_folder2),
             "duplicate_count": len(duplicates),
-            "space_needed_folder1": sum(doc.size for doc in missing_in_folder1),
-            "space_needed_folder2": sum(doc.size for doc in missing_in_folder2),
+            "space_needed_folder1": space_needed_folder1,
+            "space_needed_folder2": space_needed_folder2,
         }
     finally:
         db.close()
@@ -1042,7 +1759,8 @@ def sync_folders(
     strategy: str = "keep_both",
     target_folder1: Optional[str] = None,
     target_folder2: Optional[str] = None,
-    dry_run: bool = True
+    dry_run: bool = True,
+    analysis: Optional[Dict] = None
 ) -> Dict:
     """
     Synchronize files between two folders.
@@ -1054,6 +1772,8 @@ def sync_folders(
         target_folder1: Target folder for files from folder2 (if None, use folder1)
         target_folder2: Target folder for files from folder1 (if None, use folder2)
         dry_run: If True, only show what would be done
+        analysis: Result of analyze_folder_sync(folder1, folder2) the
+            caller already has (e.g. from a preview); analyzed here if None
         
     Returns:
         Dictionary with sync results
@@ -1066,7 +1786,8 @@ def sync_folders(
     if target_folder2 is None:
         target_folder2 = folder2
     
-    analysis = analyze_folder_sync(folder1, folder2)
+    if analysis is None:
+        analysis = analyze_folder_sync(folder1, folder2)
     
     if dry_run:
         return {
@@ -1077,160 +1798,71 @@ def sync_folders(
     
     copied_to_folder1 = []
     copied_to_folder2 = []
-    resolved_duplicates = []
     errors = []
     
-    # Copy files unique to folder2 to folder1
-    for doc in analysis["missing_in_folder1"]:
-        try:
-            rel_path = os.path.relpath(doc.file_path, folder2)
-            target_path = os.path.join(target_folder1, rel_path)
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            shutil.copy2(doc.file_path, target_path)
-            
-            # Verify MD5
-            new_hash = calculate_md5(target_path)
-            if new_hash == doc.md5_hash:
-                copied_to_folder1.append(target_path)
-                _index_copied_file(target_path, doc)
-                from app.reports import log_activity
-                log_activity(
-                    activity_type="sync",
-                    description=f"Synced file to {target_folder1}",
-                    document_path=target_path,
-                    space_saved_bytes=0,
-                    operation_count=1,
-                    user_id=None
-                )
-            else:
-                errors.append(f"MD5 mismatch for {target_path}")
-        except Exception as e:
-            errors.append(f"Error copying {doc.file_path}: {e}")
-    
-    # Copy files unique to folder1 to folder2
-    for doc in analysis["missing_in_folder2"]:
-        try:
-            rel_path = os.path.relpath(doc.file_path, folder1)
-            target_path = os.path.join(target_folder2, rel_path)
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            shutil.copy2(doc.file_path, target_path)
-            
-            # Verify MD5
-            new_hash = calculate_md5(target_path)
-            if new_hash == doc.md5_hash:
-                copied_to_folder2.append(target_path)
-                _index_copied_file(target_path, doc)
-                from app.reports import log_activity
-                log_activity(
-                    activity_type="sync",
-                    description=f"Synced file to {target_folder2}",
-                    document_path=target_path,
-                    space_saved_bytes=0,
-                    operation_count=1,
-                    user_id=None
-                )
-            else:
-                errors.append(f"MD5 mismatch for {target_path}")
-        except Exception as e:
-            errors.append(f"Error copying {doc.file_path}: {e}")
-    
-    # Resolve duplicates based on strategy
-    for dup_info in analysis["duplicates"]:
-        rel_path = dup_info["relative_path"]
-        docs1 = dup_info["folder1_docs"]
-        docs2 = dup_info["folder2_docs"]
+    # Directories created so far; set membership checks are atomic, and a
+    # lost race only costs a redundant makedirs(exist_ok=True)
+    created_dirs = set()
+    with ThreadPoolExecutor(max_workers=_copy_workers()) as executor:
+        # Resolve duplicates based on strategy: plan every copy first so
+        # the pool sees the I/O of all strategies at once
+        dup_plans = []
+        dup_futures = {}
+        for dup_info in analysis["duplicates"]:
+            rel_path = dup_info["relative_path"]
+            resolved, ops = _plan_duplicate(dup_info, strategy,
+                                            target_folder1, target_folder2)
+            dup_plans.append((rel_path, resolved))
+            for src, dst, dest_folder in ops:
+                future = executor.submit(_copy_plain, src, dst, created_dirs)
+                dup_futures[future] = (rel_path, dst, dest_folder)
         
-        doc1 = docs1[0]  # Take first doc from each
-        doc2 = docs2[0]
+        # Copy files unique to folder2 to folder1
+        synced1, batch_errors = _sync_copy_batch(
+            executor, analysis["missing_in_folder1"], folder2, target_folder1,
+            created_dirs
+        )
+        copied_to_folder1.extend(synced1)
+        errors.extend(batch_errors)
         
-        if strategy == "keep_both":
-            # Keep both - copy to opposite folder with suffix
-            try:
-                # Copy folder2 version to folder1 with suffix
-                target1 = os.path.join(target_folder1, f"{rel_path}.folder2")
-                os.makedirs(os.path.dirname(target1), exist_ok=True)
-                shutil.copy2(doc2.file_path, target1)
-                copied_to_folder1.append(target1)
-                
-                # Copy folder1 version to folder2 with suffix
-                target2 = os.path.join(target_folder2, f"{rel_path}.folder1")
-                os.makedirs(os.path.dirname(target2), exist_ok=True)
-                shutil.copy2(doc1.file_path, target2)
-                copied_to_folder2.append(target2)
-                
-                resolved_duplicates.append({
-                    "relative_path": rel_path,
-                    "action": "keep_both",
-                    "folder1_copy": target1,
-                    "folder2_copy": target2
-                })
-            except Exception as e:
-                errors.append(f"Error resolving duplicate {rel_path}: {e}")
+        # Copy files unique to folder1 to folder2
+        synced2, batch_errors = _sync_copy_batch(
+            executor, analysis["missing_in_folder2"], folder1, target_folder2,
+            created_dirs
+        )
+        copied_to_folder2.extend(synced2)
+        errors.extend(batch_errors)
         
-        elif strategy == "keep_newest":
-            # Keep the newest file
-            date1 = doc1.date_created or datetime.fromtimestamp(0)
-            date2 = doc2.date_created or datetime.fromtimestamp(0)
-            
-            if date2 > date1:
-                # Keep folder2 version, copy to folder1
-                try:
-                    target = os.path.join(target_folder1, rel_path)
-                    os.makedirs(os.path.dirname(target), exist_ok=True)
-                    shutil.copy2(doc2.file_path, target)
-                    copied_to_folder1.append(target)
-                    resolved_duplicates.append({
-                        "relative_path": rel_path,
-                        "action": "keep_newest_folder2",
-                        "target": target
-                    })
-                except Exception as e:
-                    errors.append(f"Error resolving duplicate {rel_path}: {e}")
-            else:
-                # Keep folder1 version, copy to folder2
-                try:
-                    target = os.path.join(target_folder2, rel_path)
-                    os.makedirs(os.path.dirname(target), exist_ok=True)
-                    shutil.copy2(doc1.file_path, target)
-                    copied_to_folder2.append(target)
-                    resolved_duplicates.append({
-                        "relative_path": rel_path,
-                        "action": "keep_newest_folder1",
-                        "target": target
-                    })
-                except Exception as e:
-                    errors.append(f"Error resolving duplicate {rel_path}: {e}")
-        
-        elif strategy == "keep_largest":
-            # Keep the largest file
-            if doc2.size > doc1.size:
-                # Keep folder2 version, copy to folder1
-                try:
-                    target = os.path.join(target_folder1, rel_path)
-                    os.makedirs(os.path.dirname(target), exist_ok=True)
-                    shutil.copy2(doc2.file_path, target)
-                    copied_to_folder1.append(target)
-                    resolved_duplicates.append({
-                        "relative_path": rel_path,
-                        "action": "keep_largest_folder2",
-                        "target": target
-                    })
-                except Exception as e:
-                    errors.append(f"Error resolving duplicate {rel_path}: {e}")
+        failed_duplicates = set()
+        for future in as_completed(dup_futures):
+            rel_path, dst, dest_folder = dup_futures[future]
+            error = future.result()
+            if error:
+                errors.append(f"Error resolving duplicate {rel_path}: {error}")
+                failed_duplicates.add(rel_path)
+            elif dest_folder == 1:
+                copied_to_folder1.append(dst)
             else:
-                # Keep folder1 version, copy to folder2
-                try:
-                    target = os.path.join(target_folder2, rel_path)
-                    os.makedirs(os.path.dirname(target), exist_ok=True)
-                    shutil.copy2(doc1.file_path, target)
-                    copied_to_folder2.append(target)
-                    resolved_duplicates.append({
-                        "relative_path": rel_path,
-                        "action": "keep_largest_folder1",
-                        "target": target
-                    })
-                except Exception as e:
-                    errors.append(f"Error resolving duplicate {rel_path}: {e}")
+                copied_to_folder2.append(dst)
+        resolved_duplicates = [
+            resolved for rel_path, resolved in dup_plans
+            if resolved and rel_path not in failed_duplicates
+        ]
+    
+    try:
+        log_activity_bulk([
+            {
+                "activity_type": "sync",
+                "description": f"Synced file to {target_folder}",
+                "document_path": target_path,
+            }
+            for target_folder, synced in ((target_folder1, synced1),
+                                          (target_folder2, synced2))
+            for target_path in synced
+        ])
+    except Exception as e:
+        # The files are copied; report the logging failure with the result
+        errors.append(f"Error logging sync activity: {e}")
     
     return {
         "status": "completed",
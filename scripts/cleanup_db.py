@@ -9,14 +9,27 @@ import os
 import schedule
 import time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import settings
-from app.database import SessionLocal, Activity, Document
-from sqlalchemy import text
+from app.database import SessionLocal, Activity, Document, engine
+from sqlalchemy import select, text
+
+# Threads checking whether indexed files still exist
+EXISTS_WORKERS = 32
+
+# Document rows fetched and checked per keyset page
+EXISTS_CHUNK_SIZE = 5000
+
+# Ids per DELETE ... WHERE id IN (...) statement
+DELETE_BATCH_SIZE = 500
+
+# Old activity rows removed per DELETE and commit
+ACTIVITY_DELETE_BATCH = 10000
 
 
 def cleanup_old_activities() -> int:
@@ -31,12 +44,20 @@ def cleanup_old_activities() -> int:
             days=settings.cleanup_retention_days
         )
         
-        # Delete old activities
-        result = db.query(Activity).filter(
-            Activity.created_at < cutoff_date
-        ).delete()
-        
-        db.commit()
+        # Delete old activities in bounded batches (an index range on
+        # created_at), committing each so no transaction grows unbounded
+        result = 0
+        while True:
+            batch_ids = select(Activity.id).where(
+                Activity.created_at < cutoff_date
+            ).limit(ACTIVITY_DELETE_BATCH).scalar_subquery()
+            deleted = db.query(Activity).filter(
+                Activity.id.in_(batch_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            result += deleted
+            if deleted < ACTIVITY_DELETE_BATCH:
+                break
         
         print(
             f"[{datetime.now()}] Cleaned up {result} old activity logs "
@@ -58,15 +79,36 @@ def cleanup_orphaned_documents() -> int:
     
     db = SessionLocal()
     try:
-        # Get all documents
-        documents = db.query(Document).all()
-        orphaned_count = 0
+        # Keyset pages of (id, path) tuples, each fully fetched before its
+        # stat pass so no cursor (or SQLite read lock) stays open while the
+        # slow existence checks run
+        orphaned_ids = []
+        last_id = 0
         
-        for doc in documents:
-            if not os.path.exists(doc.file_path):
-                # File doesn't exist - mark for deletion
-                db.delete(doc)
-                orphaned_count += 1
+        # Existence checks are independent stat calls, so overlap them
+        with ThreadPoolExecutor(max_workers=EXISTS_WORKERS) as executor:
+            while True:
+                chunk = db.query(Document.id, Document.file_path).filter(
+                    Document.id > last_id
+                ).order_by(Document.id).limit(EXISTS_CHUNK_SIZE).all()
+                if not chunk:
+                    break
+                # End the read transaction before the stat pass
+                db.rollback()
+                last_id = chunk[-1][0]
+                exists = executor.map(os.path.exists,
+                                      (file_path for _, file_path in chunk))
+                orphaned_ids.extend(
+                    doc_id for (doc_id, _), found in zip(chunk, exists)
+                    if not found
+                )
+        orphaned_count = len(orphaned_ids)
+        
+        # Bulk DELETEs, batched to stay below the bound-parameter limit
+        for start in range(0, orphaned_count, DELETE_BATCH_SIZE):
+            db.query(Document).filter(
+                Document.id.in_(orphaned_ids[start:start + DELETE_BATCH_SIZE])
+            ).delete(synchronize_session=False)
         
         if orphaned_count > 0:
             db.commit()
@@ -88,8 +130,19 @@ def run_cleanup() -> None:
     """Run all cleanup tasks."""
     print(f"[{datetime.now()}] Starting database cleanup...")
     
-    activities_cleaned = cleanup_old_activities()
-    documents_cleaned = cleanup_orphaned_documents()
+    if engine.dialect.name == "sqlite":
+        # SQLite locks the whole database file, so the tasks would only
+        # block each other's commits; run them one after the other
+        activities_cleaned = cleanup_old_activities()
+        documents_cleaned = cleanup_orphaned_documents()
+    else:
+        # Different tables and separate sessions, so the orphan stat()
+        # scan overlaps with the activity deletes
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            activities_future = executor.submit(cleanup_old_activities)
+            documents_future = executor.submit(cleanup_orphaned_documents)
+            activities_cleaned = activities_future.result()
+            documents_cleaned = documents_future.result()
     
     print(
         f"[{datetime.now()}] Cleanup completed: "
@@ -148,8 +201,13 @@ def main() -> None:
     print("Scheduler started. Press Ctrl+C to stop.")
     try:
         while True:
+            # Sleep until the next job is due instead of polling
+            idle = schedule.idle_seconds()
+            if idle is None:
+                break  # No jobs left
+            if idle > 0:
+                time.sleep(idle)
             schedule.run_pending()
-            time.sleep(60)  # Check every minute
     except KeyboardInterrupt:
         print("\nScheduler stopped.")
 
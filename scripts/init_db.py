@@ -14,7 +14,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.exc import OperationalError
 from app.config import settings
-from app.database import Base, init_db, migrate_add_role_column, init_fts5
+from app.database import (
+    Base, init_db, migrate_add_role_column, migrate_add_document_columns,
+    init_fts5
+)
 from app.auth import get_password_hash
 from app.database import User, SessionLocal
 
@@ -69,15 +72,20 @@ def create_database_if_not_exists() -> bool:
         
         # Check if database exists
         with admin_engine.connect() as conn:
-            result = conn.execute(text(
-                f"SELECT 1 FROM pg_database WHERE datname = '{settings.db_name}'"
-            ))
+            result = conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": settings.db_name}
+            )
             exists = result.fetchone() is not None
             
             if not exists:
                 # Create database
                 conn.execute(text("COMMIT"))  # End any transaction
-                conn.execute(text(f'CREATE DATABASE "{settings.db_name}"'))
+                # CREATE DATABASE takes no bind parameters; quote the name
+                quoted_name = admin_engine.dialect.identifier_preparer.quote(
+                    settings.db_name
+                )
+                conn.execute(text(f"CREATE DATABASE {quoted_name}"))
                 conn.commit()
                 print(f"Database '{settings.db_name}' created successfully.")
                 return True
@@ -161,6 +169,7 @@ def main() -> None:
         # Run migrations (for SQLite compatibility)
         if "sqlite" in database_url:
             migrate_add_role_column(engine)
+            migrate_add_document_columns(engine)
             init_fts5(engine)
         else:
             # For PostgreSQL, migrations will be handled by Alembic
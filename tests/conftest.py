@@ -20,23 +20,25 @@ def temp_dir():
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-@pytest.fixture(scope="function")
-def test_db():
-    """Create a test database."""
-    test_db_path = tempfile.mktemp(suffix=".db")
-    from app.config import settings
-    original_url = settings.database_url
-    settings.database_url = f"sqlite:///{test_db_path}"
+@pytest.fixture(scope="session")
+def test_db_engine():
+    """Create the test database schema once per test session."""
+    from app.database import init_db
+    from sqlalchemy import event
+    from tests.test_utils import create_memory_engine
+
+    test_engine, test_db_url = create_memory_engine("docusync_test")
+
+    # pysqlite's implicit transaction handling breaks SAVEPOINT, which the
+    # per-test rollback relies on; let SQLAlchemy emit BEGIN itself
+    @event.listens_for(test_engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(test_engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
 
-    from app.database import Base, init_db
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    
-    # Recreate engine with new database URL
-    test_engine = create_engine(
-        settings.database_url,
-        connect_args={"check_same_thread": False}
-    )
     Base.metadata.create_all(bind=test_engine)
     init_db(test_engine)  # This initializes FTS5
     
@@ -47,8 +49,8 @@ def test_db():
         existing_user = db.query(User).filter(User.username == "admin").first()
         if not existing_user:
             # Use bcrypt directly to avoid passlib initialization issues
-            import bcrypt
-            hashed = bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            from tests.test_utils import hash_test_password
+            hashed = hash_test_password("admin")
             user = User(
                 username="admin",
                 hashed_password=hashed,
@@ -58,15 +60,63 @@ def test_db():
             db.commit()
     finally:
         db.close()
-    
-    session = TestSessionLocal()
+
+    yield test_engine, test_db_url
+
+    test_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def test_db(test_db_engine):
+    """
+    Session on the shared test database, rolled back after each test.
+
+    Commits made by the test only release a savepoint, so every test
+    starts from the seeded schema without rebuilding it.
+    """
+    from sqlalchemy.orm import Session
+
+    test_engine, test_db_url = test_db_engine
+    from app.config import settings
+    original_url = settings.database_url
+    settings.database_url = test_db_url
+
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, autoflush=False,
+                      join_transaction_mode="create_savepoint")
 
     yield session
 
     session.close()
+    transaction.rollback()
+    connection.close()
     settings.database_url = original_url
-    if os.path.exists(test_db_path):
-        os.unlink(test_db_path)
+
+
+@pytest.fixture
+def clean_tables(test_db):
+    """
+    Remove documents and activities a test adds to a module-scoped database.
+
+    For modules that override test_db with a module-scoped fixture that
+    yields its own engine; the cleanup is bound to that engine rather than
+    to whatever app.database.SessionLocal points at.
+    """
+    from sqlalchemy.engine import Engine
+    from app.database import Activity
+
+    assert isinstance(test_db, Engine), \
+        "clean_tables needs a module-scoped test_db that yields its engine"
+    yield
+
+    db = sessionmaker(bind=test_db)()
+    try:
+        db.query(Activity).delete()
+        db.query(Document).delete()
+        db.commit()
+    finally:
+        db.close()
 
 
 @pytest.fixture
@@ -109,9 +159,15 @@ def sample_txt_file(temp_dir):
     return txt_path
 
 
-@pytest.fixture(autouse=True)
-def limit_test_files(monkeypatch):
-    """Automatically limit scan operations to max_test_files in tests."""
+@pytest.fixture(scope="session", autouse=True)
+def limit_test_files():
+    """Limit scan operations to max_test_files for the whole test session."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        yield from _limit_scans(monkeypatch)
+
+
+def _limit_scans(monkeypatch):
+    """Patch the scanners with max_test_files wrappers."""
     max_files = settings.max_test_files
     
     # Patch scan_drive to use max_files limit
@@ -142,11 +198,28 @@ def limit_test_files(monkeypatch):
     monkeypatch.setattr(
         file_scanner, "scan_all_drives", limited_scan_all_drives
     )
+    yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def track_file_operations():
+    """Patch move and sync operations once so tests can revert them."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        yield from _track_operations(monkeypatch)
 
 
 @pytest.fixture(autouse=True)
-def temporary_file_operations(monkeypatch):
-    """Automatically patch move and sync operations to be temporary in tests."""
+def temporary_file_operations(track_file_operations):
+    """Revert files moved or copied by each test."""
+    from tests.test_utils import get_operation_tracker
+
+    yield
+
+    get_operation_tracker().revert_all()
+
+
+def _track_operations(monkeypatch):
+    """Wrap move and sync operations to record them in the tracker."""
     from tests.test_utils import get_operation_tracker
     import shutil
     
@@ -181,6 +254,7 @@ def temporary_file_operations(monkeypatch):
     from app import sync
     original_sync_drives = sync.sync_drives
     original_shutil_copy2 = shutil.copy2
+    original_copy_with_md5 = sync._copy_with_md5
     
     def tracked_copy2(src, dst, *args, **kwargs):
         """Wrapper that tracks copy operations."""
@@ -189,29 +263,35 @@ def temporary_file_operations(monkeypatch):
         tracker.track_copy(dst)
         return result
     
+    def tracked_copy_with_md5(src, dst, *args, **kwargs):
+        """Wrapper that tracks the copy-and-hash helper used by sync."""
+        tracker = get_operation_tracker()
+        result = original_copy_with_md5(src, dst, *args, **kwargs)
+        tracker.track_copy(dst)
+        return result
+    
     def tracked_sync_drives(drive1, drive2, target_dir_drive1="", 
-                            target_dir_drive2="", dry_run=True):
+                            target_dir_drive2="", dry_run=True,
+                            analysis=None):
         """Wrapper that tracks sync operations."""
         tracker = get_operation_tracker()
         
         # If not dry run, patch shutil.copy2 temporarily
         if not dry_run:
-            monkeypatch.setattr(shutil, "copy2", tracked_copy2)
+            shutil.copy2 = tracked_copy2
+            sync._copy_with_md5 = tracked_copy_with_md5
         
         try:
             result = original_sync_drives(
-                drive1, drive2, target_dir_drive1, target_dir_drive2, dry_run
+                drive1, drive2, target_dir_drive1, target_dir_drive2, dry_run,
+                analysis
             )
             return result
         finally:
             if not dry_run:
-                monkeypatch.setattr(shutil, "copy2", original_shutil_copy2)
+                shutil.copy2 = original_shutil_copy2
+                sync._copy_with_md5 = original_copy_with_md5
     
     monkeypatch.setattr(sync, "sync_drives", tracked_sync_drives)
-    
-    # Revert all operations after test
     yield
-    
-    tracker = get_operation_tracker()
-    tracker.revert_all()
 
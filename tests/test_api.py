@@ -7,28 +7,21 @@ from app.main import app
 from app.database import init_db
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def test_db():
-    """Create a test database."""
-    import tempfile
-    import os
-    test_db_path = tempfile.mktemp(suffix=".db")
+    """Create a test database shared by the tests in this module."""
     from app.config import settings
+    from tests.test_utils import create_memory_engine
     original_url = settings.database_url
-    settings.database_url = f"sqlite:///{test_db_path}"
 
     from app.database import Base, init_db, User, engine, SessionLocal
-    from sqlalchemy import create_engine
     from sqlalchemy.orm import sessionmaker
     import app.database as db_module
     
-    # Recreate engine with new database URL
-    test_engine = create_engine(
-        settings.database_url,
-        connect_args={"check_same_thread": False}
+    # Fresh in-memory database for this module
+    test_engine, settings.database_url = create_memory_engine(
+        "docusync_api"
     )
-    # Drop and recreate to ensure clean schema
-    Base.metadata.drop_all(bind=test_engine)
     Base.metadata.create_all(bind=test_engine)
     init_db(test_engine)  # This initializes FTS5
     
@@ -42,8 +35,8 @@ def test_db():
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
     db = TestSessionLocal()
     try:
-        import bcrypt
-        hashed = bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        from tests.test_utils import hash_test_password
+        hashed = hash_test_password("admin")
         user = User(
             username="admin",
             hashed_password=hashed,
@@ -54,7 +47,7 @@ def test_db():
     finally:
         db.close()
 
-    yield
+    yield test_engine
     
     # Restore original engine and SessionLocal
     db_module.engine = original_engine
@@ -64,22 +57,20 @@ def test_db():
     test_engine.dispose()
 
     settings.database_url = original_url
-    if os.path.exists(test_db_path):
-        try:
-            os.unlink(test_db_path)
-        except PermissionError:
-            pass  # File may be locked, ignore
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client(test_db):
     """Create test client."""
     return TestClient(app)
 
 
-@pytest.fixture
-def authenticated_client(client):
+@pytest.fixture(scope="module")
+def authenticated_client(test_db):
     """Create authenticated client."""
+    # Separate client so the token does not leak into `client`
+    client = TestClient(app)
+
     # Login to get token
     response = client.post(
         "/api/auth/login",
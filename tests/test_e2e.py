@@ -21,26 +21,21 @@ def temp_dir():
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def test_db():
-    """Create a test database."""
-    import tempfile
-    test_db_path = tempfile.mktemp(suffix=".db")
+    """Create a test database shared by the tests in this module."""
     from app.config import settings
+    from tests.test_utils import create_memory_engine
     original_url = settings.database_url
-    settings.database_url = f"sqlite:///{test_db_path}"
 
     from app.database import Base, init_db, User, engine, SessionLocal
-    from sqlalchemy import create_engine
     from sqlalchemy.orm import sessionmaker
     import app.database as db_module
     
-    # Recreate engine with new database URL
-    test_engine = create_engine(
-        settings.database_url,
-        connect_args={"check_same_thread": False}
+    # Fresh in-memory database for this module
+    test_engine, settings.database_url = create_memory_engine(
+        "docusync_e2e"
     )
-    Base.metadata.drop_all(bind=test_engine)
     Base.metadata.create_all(bind=test_engine)
     init_db(test_engine)  # This initializes FTS5
     
@@ -54,8 +49,8 @@ def test_db():
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
     db = TestSessionLocal()
     try:
-        import bcrypt
-        hashed = bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        from tests.test_utils import hash_test_password
+        hashed = hash_test_password("admin")
         user = User(
             username="admin",
             hashed_password=hashed,
@@ -66,7 +61,7 @@ def test_db():
     finally:
         db.close()
 
-    yield
+    yield test_engine
     
     # Restore original engine and SessionLocal
     db_module.engine = original_engine
@@ -76,23 +71,21 @@ def test_db():
     test_engine.dispose()
 
     settings.database_url = original_url
-    if os.path.exists(test_db_path):
-        try:
-            os.unlink(test_db_path)
-        except PermissionError:
-            pass  # File may be locked, ignore
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client(test_db):
     """Create test client."""
     client = TestClient(app)
     return client
 
 
-@pytest.fixture
-def authenticated_client(client):
+@pytest.fixture(scope="module")
+def authenticated_client(test_db):
     """Create authenticated client."""
+    # Separate client so the token does not leak into `client`
+    client = TestClient(app)
+
     # Login to get token
     response = client.post(
         "/api/auth/login",
@@ -141,7 +134,7 @@ def test_e2e_protected_endpoints(client, authenticated_client):
     assert response.status_code == 200
 
 
-def test_e2e_document_workflow(temp_dir, authenticated_client):
+def test_e2e_document_workflow(temp_dir, authenticated_client, clean_tables):
     """Test complete document workflow."""
     # Create a test document
     test_file = os.path.join(temp_dir, "test_document.txt")
@@ -173,7 +166,7 @@ def test_e2e_document_workflow(temp_dir, authenticated_client):
     assert duplicates["total_groups"] == 0
 
 
-def test_e2e_activity_tracking(temp_dir, authenticated_client):
+def test_e2e_activity_tracking(temp_dir, authenticated_client, clean_tables):
     """Test activity tracking."""
     from app.reports import log_activity, get_activities
 
@@ -215,7 +208,7 @@ def test_e2e_reports(authenticated_client):
     assert isinstance(report, dict)
 
 
-def test_e2e_full_workflow(temp_dir, authenticated_client):
+def test_e2e_full_workflow(temp_dir, authenticated_client, clean_tables):
     """Test full workflow: scan, search, delete, report."""
     # Create test files
     file1 = os.path.join(temp_dir, "test1.txt")
@@ -4,7 +4,7 @@ import pytest
 import os
 from app.file_scanner import (
     calculate_md5, get_file_metadata, scan_drive,
-    index_document, extract_text_content
+    index_document, index_documents, extract_text_content
 )
 from app.database import Document
 
@@ -64,3 +64,174 @@ def test_extract_text_content_pdf(sample_pdf_file):
     # Just verify function doesn't crash
     assert text is not None or text is None
 
+
+def test_calculate_md5_large_file(temp_dir):
+    """Test that a file spanning several read chunks matches hashlib."""
+    import hashlib
+    from app.config import settings
+
+    data = os.urandom(1024) * (3 * settings.chunk_size // 1024 + 3)
+    path = os.path.join(temp_dir, "large.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    assert calculate_md5(path) == hashlib.md5(data).hexdigest()
+
+
+def test_calculate_md5_readinto_fallback(temp_dir, monkeypatch):
+    """Test the pre-3.11 readinto loop used without hashlib.file_digest."""
+    import hashlib
+    import app.file_scanner as file_scanner
+    from app.config import settings
+
+    monkeypatch.setattr(file_scanner, "HAS_FILE_DIGEST", False)
+    data = os.urandom(1024) * (2 * settings.chunk_size // 1024 + 1)
+    path = os.path.join(temp_dir, "fallback.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    assert calculate_md5(path) == hashlib.md5(data).hexdigest()
+
+
+def test_index_document_reuses_unchanged_md5(test_db, sample_txt_file,
+                                             monkeypatch):
+    """Test that re-indexing an unchanged file does not rehash it."""
+    import app.database as db_module
+    import app.file_scanner as file_scanner
+    from sqlalchemy.orm import sessionmaker
+
+    monkeypatch.setattr(db_module, "SessionLocal",
+                        sessionmaker(bind=test_db.get_bind()))
+    first = index_document(sample_txt_file, extract_text=False)
+    assert first is not None
+
+    def fail_md5(file_path):
+        raise AssertionError("unchanged file was rehashed")
+
+    monkeypatch.setattr(file_scanner, "calculate_md5", fail_md5)
+    assert index_document(sample_txt_file, extract_text=False) is not None
+
+    stored = test_db.query(Document).filter(
+        Document.file_path == sample_txt_file
+    ).one()
+    assert stored.md5_hash == first.md5_hash
+
+
+def test_index_documents_bulk(test_db, sample_txt_file, temp_dir,
+                              monkeypatch):
+    """Test indexing hashed files in one pass, updating existing rows."""
+    import app.database as db_module
+    from sqlalchemy.orm import sessionmaker
+
+    monkeypatch.setattr(db_module, "SessionLocal",
+                        sessionmaker(bind=test_db.get_bind()))
+    assert index_document(sample_txt_file, extract_text=False) is not None
+    missing = os.path.join(temp_dir, "gone.txt")
+
+    indexed = index_documents({
+        sample_txt_file: "f" * 32,
+        missing: "e" * 32,
+        os.path.join(temp_dir, "unreadable.txt"): None,
+    })
+
+    assert indexed == 1
+    test_db.expire_all()
+    stored = test_db.query(Document).filter(
+        Document.file_path == sample_txt_file
+    ).one()
+    assert stored.md5_hash == "f" * 32
+    assert test_db.query(Document).count() == 1
+
+
+def test_index_documents_clears_text_of_changed_file(test_db, sample_txt_file,
+                                                      monkeypatch):
+    """Test that a new MD5 drops text extracted from the old content."""
+    import app.database as db_module
+    from sqlalchemy.orm import sessionmaker
+
+    monkeypatch.setattr(db_module, "SessionLocal",
+                        sessionmaker(bind=test_db.get_bind()))
+    assert index_document(sample_txt_file, extract_text=True) is not None
+    with open(sample_txt_file, "w", encoding="utf-8") as f:
+        f.write("Rewritten content.")
+
+    assert index_documents({sample_txt_file: calculate_md5(sample_txt_file)}) == 1
+
+    test_db.expire_all()
+    stored = test_db.query(Document).filter(
+        Document.file_path == sample_txt_file
+    ).one()
+    assert stored.md5_hash == calculate_md5(sample_txt_file)
+    assert stored.extracted_text is None
+    assert stored.extracted_text_preview is None
+
+
+def test_index_documents_skips_only_bad_rows(test_db, temp_dir, monkeypatch):
+    """Test that a row failing to insert does not roll back the others."""
+    import app.database as db_module
+    import app.file_scanner as file_scanner
+    from sqlalchemy.orm import sessionmaker
+
+    monkeypatch.setattr(db_module, "SessionLocal",
+                        sessionmaker(bind=test_db.get_bind()))
+    paths = []
+    for name in ("good1.txt", "bad.txt", "good2.txt"):
+        path = os.path.join(temp_dir, name)
+        with open(path, "w") as f:
+            f.write(name)
+        paths.append(path)
+    original_metadata = file_scanner.get_file_metadata
+
+    def metadata_with_bad_row(file_path):
+        metadata = original_metadata(file_path)
+        if file_path.endswith("bad.txt"):
+            metadata["size_on_disc"] = None  # NOT NULL column
+        return metadata
+
+    monkeypatch.setattr(file_scanner, "get_file_metadata",
+                        metadata_with_bad_row)
+    errors = []
+
+    indexed = index_documents({path: "a" * 32 for path in paths}, errors)
+
+    assert indexed == 2
+    assert len(errors) == 1 and "bad.txt" in errors[0]
+    test_db.expire_all()
+    stored = sorted(
+        row[0] for row in test_db.query(Document.basename)
+    )
+    assert stored == ["good1.txt", "good2.txt"]
+
+
+def test_index_documents_from_templates_skips_only_bad_rows(test_db,
+                                                           temp_dir,
+                                                           monkeypatch):
+    """Test that a copy failing to insert does not roll back the others."""
+    import app.database as db_module
+    from types import SimpleNamespace
+    from sqlalchemy.orm import sessionmaker
+    from app.file_scanner import index_documents_from_templates
+
+    monkeypatch.setattr(db_module, "SessionLocal",
+                        sessionmaker(bind=test_db.get_bind()))
+
+    def template(size_on_disc):
+        return SimpleNamespace(
+            size=4, size_on_disc=size_on_disc, mtime_ns=None,
+            date_published=None, md5_hash="a" * 32, author=None,
+            extracted_text=None, extracted_text_preview=None
+        )
+
+    copies = [
+        (os.path.join(temp_dir, "good1.txt"), template(4)),
+        (os.path.join(temp_dir, "bad.txt"), template(None)),  # NOT NULL
+        (os.path.join(temp_dir, "good2.txt"), template(4)),
+    ]
+    errors = []
+
+    assert index_documents_from_templates(copies, errors) == 2
+
+    assert len(errors) == 1 and "bad.txt" in errors[0]
+    test_db.expire_all()
+    stored = sorted(row[0] for row in test_db.query(Document.basename))
+    assert stored == ["good1.txt", "good2.txt"]
@@ -37,8 +37,8 @@ def test_db():
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
     db = TestSessionLocal()
     try:
-        import bcrypt
-        hashed = bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        from tests.test_utils import hash_test_password
+        hashed = hash_test_password("admin")
         user = User(
             username="admin",
             hashed_password=hashed,
@@ -0,0 +1,797 @@
+"""Tests for drive and folder synchronization helpers."""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import sync
+from app.sync import scan_folder
+
+
+@pytest.fixture
+def sync_db(temp_dir, monkeypatch):
+    """Point app.database and app.sync at a fresh SQLite database."""
+    import app.database as db_module
+    import app.reports as reports_module
+
+    engine = create_engine(
+        f"sqlite:///{os.path.join(temp_dir, 'sync.db')}",
+        connect_args={"check_same_thread": False}
+    )
+    db_module.init_db(engine)
+    session_local = sessionmaker(autocommit=False, autoflush=False,
+                                 bind=engine)
+    monkeypatch.setattr(db_module, "SessionLocal", session_local)
+    monkeypatch.setattr(sync, "SessionLocal", session_local)
+    monkeypatch.setattr(reports_module, "SessionLocal", session_local)
+    yield session_local
+    engine.dispose()
+
+
+@pytest.fixture
+def sync_folders_pair(temp_dir):
+    """Create two folders with one shared and one unique file each."""
+    folder1 = os.path.join(temp_dir, "folder1")
+    folder2 = os.path.join(temp_dir, "folder2")
+    for folder, unique in ((folder1, "only1.txt"), (folder2, "only2.txt")):
+        os.makedirs(os.path.join(folder, "sub"))
+        with open(os.path.join(folder, "sub", "shared.txt"), "w") as f:
+            f.write("same content")
+        with open(os.path.join(folder, unique), "w") as f:
+            f.write(f"unique {unique}")
+    return folder1, folder2
+
+
+def test_scan_folder_filters_extensions(temp_dir):
+    """Test that scan_folder matches extensions case-insensitively."""
+    for name in ["a.PDF", "b.txt", ".pdf", "c.xyz", "noext"]:
+        open(os.path.join(temp_dir, name), "w").close()
+
+    found = sorted(os.path.basename(p) for p in scan_folder(temp_dir))
+
+    assert found == ["a.PDF", "b.txt"]
+
+
+def test_scan_folder_skips_hidden_dirs(temp_dir):
+    """Test that scan_folder does not descend into hidden directories."""
+    hidden = os.path.join(temp_dir, ".hidden")
+    os.makedirs(hidden)
+    open(os.path.join(hidden, "secret.txt"), "w").close()
+    open(os.path.join(temp_dir, "visible.txt"), "w").close()
+
+    found = [os.path.basename(p) for p in scan_folder(temp_dir)]
+
+    assert found == ["visible.txt"]
+
+
+def test_scan_folder_stats_reports_size_and_mtime(temp_dir):
+    """Test that the scan returns stat data for nested documents."""
+    nested = os.path.join(temp_dir, "sub", "deeper")
+    os.makedirs(nested)
+    path = os.path.join(nested, "book.pdf")
+    with open(path, "wb") as f:
+        f.write(b"x" * 42)
+    os.utime(path, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+
+    found = sync.scan_folder_stats(temp_dir)
+
+    assert found == {path: (42, 1_000_000_000_000_000_000)}
+
+
+def test_hash_files_matches_calculate_md5(temp_dir):
+    """Test that batch hashing agrees with calculate_md5 per file."""
+    from app.file_scanner import calculate_md5
+    from app.sync import hash_files
+
+    paths = []
+    for i in range(3):
+        path = os.path.join(temp_dir, f"f{i}.txt")
+        with open(path, "w") as f:
+            f.write(f"content {i}")
+        paths.append(path)
+    missing = os.path.join(temp_dir, "missing.txt")
+
+    hashes = hash_files(paths + [missing])
+
+    assert hashes[missing] is None
+    for path in paths:
+        assert hashes[path] == calculate_md5(path)
+
+
+def test_hash_pool_follows_hash_workers(monkeypatch):
+    """Test that changing hash_workers replaces and shuts down the pool."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "hash_workers", 2)
+    try:
+        first = sync._hash_pool()
+        assert sync._hash_pool() is first
+
+        monkeypatch.setattr(settings, "hash_workers", 3)
+        second = sync._hash_pool()
+
+        assert second is not first
+        with pytest.raises(RuntimeError):
+            first.submit(len, "")
+    finally:
+        sync._shutdown_hash_pool()
+    with pytest.raises(RuntimeError):
+        second.submit(len, "")
+
+
+def test_hash_files_sequential_when_one_worker(temp_dir, monkeypatch):
+    """Test that hash_workers=1 keeps large batches out of the pool."""
+    from app.config import settings
+
+    def no_pool():
+        raise AssertionError("pool used with hash_workers=1")
+
+    monkeypatch.setattr(settings, "hash_workers", 1)
+    monkeypatch.setattr(sync, "_hash_pool", no_pool)
+    paths = []
+    for i in range(sync.PARALLEL_HASH_MIN_FILES):
+        path = os.path.join(temp_dir, f"f{i}.txt")
+        with open(path, "w") as f:
+            f.write(f"content {i}")
+        paths.append(path)
+
+    assert len(sync.hash_files(paths)) == len(paths)
+
+
+def test_analyze_folder_sync_skips_unchanged_files(sync_db, sync_folders_pair,
+                                                   monkeypatch):
+    """Test that a second analysis does not re-hash unchanged files."""
+    folder1, folder2 = sync_folders_pair
+    first = sync.analyze_folder_sync(folder1, folder2)
+
+    hashed = []
+    original_md5 = sync.calculate_md5
+
+    def counting_md5(file_path):
+        hashed.append(file_path)
+        return original_md5(file_path)
+
+    monkeypatch.setattr(sync, "calculate_md5", counting_md5)
+    second = sync.analyze_folder_sync(folder1, folder2)
+
+    assert hashed == []
+    assert second["exact_match_count"] == first["exact_match_count"] == 1
+    assert second["missing_count_folder1"] == 1
+    assert second["missing_count_folder2"] == 1
+    assert second["space_needed_folder1"] == os.path.getsize(
+        os.path.join(folder2, "only2.txt"))
+    assert second["space_needed_folder2"] == os.path.getsize(
+        os.path.join(folder1, "only1.txt"))
+
+
+def test_match_by_md5_pairs_and_leftovers():
+    """Test MD5 pairing for single and multiple docs per relative path."""
+    from types import SimpleNamespace
+    from app.sync import _match_by_md5
+
+    a = SimpleNamespace(md5_hash="a", size=1)
+    b = SimpleNamespace(md5_hash="a", size=1)
+    matched, left1, left2 = _match_by_md5([a], [b])
+    assert [(p["folder1"], p["folder2"]) for p in matched] == [(a, b)]
+    assert left1 == [] and left2 == []
+
+    c = SimpleNamespace(md5_hash="c", size=1)
+    matched, left1, left2 = _match_by_md5([a], [c])
+    assert matched == [] and left1 == [a] and left2 == [c]
+
+    # A size mismatch is a content mismatch whatever the stored hash says
+    resized = SimpleNamespace(md5_hash="a", size=2)
+    matched, left1, left2 = _match_by_md5([a], [resized])
+    assert matched == [] and left1 == [a] and left2 == [resized]
+
+    a2 = SimpleNamespace(md5_hash="a", size=1)
+    matched, left1, left2 = _match_by_md5([a, a2, c], [b])
+    assert len(matched) == 1
+    assert left1 == [a2, c] and left2 == []
+
+
+def test_copy_with_md5(temp_dir):
+    """Test that the streaming copy writes identical bytes and metadata."""
+    import hashlib
+    from app.sync import _copy_with_md5
+
+    src = os.path.join(temp_dir, "src.bin")
+    dst = os.path.join(temp_dir, "dst.bin")
+    data = os.urandom(300_000)
+    with open(src, "wb") as f:
+        f.write(data)
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+
+    digest = _copy_with_md5(src, dst, bufsize=64 * 1024)
+
+    assert digest == hashlib.md5(data).hexdigest()
+    with open(dst, "rb") as f:
+        assert f.read() == data
+    assert int(os.stat(dst).st_mtime) == 1_000_000_000
+
+    # The buffer is reused, so a shorter file must not pick up stale bytes
+    small_src = os.path.join(temp_dir, "small.bin")
+    small_dst = os.path.join(temp_dir, "small_copy.bin")
+    with open(small_src, "wb") as f:
+        f.write(b"short")
+
+    digest = _copy_with_md5(small_src, small_dst, bufsize=64 * 1024)
+
+    assert digest == hashlib.md5(b"short").hexdigest()
+    with open(small_dst, "rb") as f:
+        assert f.read() == b"short"
+
+
+
+def test_copy_with_md5_partial_writes(temp_dir, monkeypatch):
+    """Test that short unbuffered writes are retried until complete."""
+    import builtins
+    import hashlib
+
+    class ShortWrites:
+        def __init__(self, raw):
+            self.raw = raw
+
+        def write(self, data):
+            return self.raw.write(data[:1000])
+
+        def __getattr__(self, name):
+            return getattr(self.raw, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.raw.close()
+
+    def short_open(path, mode="r", *args, **kwargs):
+        raw = builtins.open(path, mode, *args, **kwargs)
+        return ShortWrites(raw) if "w" in mode else raw
+
+    src = os.path.join(temp_dir, "src.bin")
+    dst = os.path.join(temp_dir, "dst.bin")
+    data = os.urandom(10_000)
+    with open(src, "wb") as f:
+        f.write(data)
+    monkeypatch.setattr(sync, "open", short_open, raising=False)
+
+    assert sync._copy_with_md5(src, dst) == hashlib.md5(data).hexdigest()
+    with builtins.open(dst, "rb") as f:
+        assert f.read() == data
+
+
+def test_sync_folders_copies_missing_files(sync_db, sync_folders_pair):
+    """Test that sync_folders copies unique files both ways."""
+    folder1, folder2 = sync_folders_pair
+
+    result = sync.sync_folders(folder1, folder2, dry_run=False)
+
+    assert result["status"] == "completed"
+    assert result["errors"] == []
+    assert result["copied_to_folder1"] == 1
+    assert result["copied_to_folder2"] == 1
+    assert os.path.exists(os.path.join(folder1, "only2.txt"))
+    assert os.path.exists(os.path.join(folder2, "only1.txt"))
+
+
+def test_sync_folders_keep_both_duplicates(sync_db, sync_folders_pair):
+    """Test that keep_both copies each side of a conflict with a suffix."""
+    folder1, folder2 = sync_folders_pair
+    with open(os.path.join(folder2, "sub", "shared.txt"), "w") as f:
+        f.write("changed content")
+
+    result = sync.sync_folders(folder1, folder2, strategy="keep_both",
+                               dry_run=False)
+
+    assert result["errors"] == []
+    assert result["resolved_duplicates"] == 1
+    assert result["copied_to_folder1"] == 2
+    assert result["copied_to_folder2"] == 2
+    for folder, suffix in ((folder1, ".folder2"), (folder2, ".folder1")):
+        names = [name for _, _, files in os.walk(folder) for name in files]
+        assert any(name.endswith(suffix) for name in names)
+
+
+def test_analyze_folder_sync_throttles_compare_progress(
+        sync_db, sync_folders_pair, monkeypatch):
+    """Test that per-file compare events are rate limited."""
+    folder1, folder2 = sync_folders_pair
+    monkeypatch.setattr(sync, "COMPARE_EMIT_INTERVAL", 3600.0)
+    events = []
+
+    sync.analyze_folder_sync(folder1, folder2, progress_callback=events.append)
+
+    per_file = [e for e in events if e.get("phase") == "compare"
+                and e["file"] != "Comparison completed"]
+    # The first and the last comparison are always reported
+    assert len(per_file) == 2
+
+
+def test_sync_folders_logs_one_activity_per_copy(sync_db, sync_folders_pair):
+    """Test that copied files are recorded in the activity log."""
+    from app.database import Activity
+
+    folder1, folder2 = sync_folders_pair
+    sync.sync_folders(folder1, folder2, dry_run=False)
+
+    db = sync_db()
+    try:
+        paths = sorted(a.document_path for a in db.query(Activity).filter(
+            Activity.activity_type == "sync"
+        ))
+    finally:
+        db.close()
+    assert paths == sorted([os.path.join(folder1, "only2.txt"),
+                            os.path.join(folder2, "only1.txt")])
+
+
+def test_sync_folders_reports_logging_failure(sync_db, sync_folders_pair,
+                                             monkeypatch):
+    """Test that a failed activity log does not discard the sync result."""
+    folder1, folder2 = sync_folders_pair
+
+    def locked(entries):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(sync, "log_activity_bulk", locked)
+    result = sync.sync_folders(folder1, folder2, dry_run=False)
+
+    assert result["status"] == "completed"
+    assert result["copied_to_folder1"] == 1
+    assert result["errors"] == [
+        "Error logging sync activity: database is locked"
+    ]
+
+
+def test_copy_one_trusts_reflinks(temp_dir, monkeypatch):
+    """Test that a reflinked copy is not read back for verification."""
+    from types import SimpleNamespace
+
+    src = os.path.join(temp_dir, "src.txt")
+    with open(src, "w") as f:
+        f.write("data")
+    monkeypatch.setattr(sync, "_reflink", lambda s, d: True)
+    monkeypatch.setattr(sync, "_copy_with_md5", pytest.fail)
+    monkeypatch.setattr(sync, "calculate_md5", pytest.fail)
+    stat = os.stat(src)
+    doc = SimpleNamespace(file_path=src, md5_hash="unused",
+                          size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    assert sync._copy_one(doc, os.path.join(temp_dir, "dst.txt")) is None
+
+
+def test_copy_one_hashes_reflink_of_modified_source(temp_dir, monkeypatch):
+    """Test that a reflink is verified when the source changed since indexing."""
+    import shutil
+    from types import SimpleNamespace
+    from app.file_scanner import calculate_md5
+
+    src = os.path.join(temp_dir, "src.txt")
+    dst = os.path.join(temp_dir, "dst.txt")
+    with open(src, "w") as f:
+        f.write("data")
+    doc = SimpleNamespace(file_path=src, md5_hash=calculate_md5(src),
+                          size=4, mtime_ns=os.stat(src).st_mtime_ns)
+    with open(src, "w") as f:
+        f.write("rewritten")
+
+    def fake_reflink(s, d):
+        shutil.copy2(s, d)
+        return True
+
+    monkeypatch.setattr(sync, "_reflink", fake_reflink)
+
+    assert sync._copy_one(doc, dst) == f"MD5 mismatch for {dst}"
+
+
+def test_analyze_folder_sync_orders_missing_files(sync_db, temp_dir):
+    """Test that missing files are listed in relative path order."""
+    folder1 = os.path.join(temp_dir, "a")
+    folder2 = os.path.join(temp_dir, "b")
+    os.makedirs(folder2)
+    names = ["m.txt", "b.txt", "z.txt", "a.txt", "k.txt", "c.txt"]
+    for name in names:
+        os.makedirs(folder1, exist_ok=True)
+        with open(os.path.join(folder1, name), "w") as f:
+            f.write(name)
+
+    result = sync.analyze_folder_sync(folder1, folder2)
+
+    listed = [os.path.basename(doc.file_path)
+              for doc in result["missing_in_folder2"]]
+    assert listed == sorted(names)
+
+
+def test_analyze_folder_sync_suspects_renamed_files(sync_db, temp_dir):
+    """Test that identical content under different names is flagged."""
+    folder1 = os.path.join(temp_dir, "a")
+    folder2 = os.path.join(temp_dir, "b")
+    for folder, name in ((folder1, "old.txt"), (folder2, "new.txt")):
+        os.makedirs(folder)
+        with open(os.path.join(folder, name), "w") as f:
+            f.write("renamed content")
+
+    result = sync.analyze_folder_sync(folder1, folder2)
+
+    assert len(result["suspected_duplicates"]) == 1
+    suspected = result["suspected_duplicates"][0]
+    assert suspected["folder1_rel_paths"] == ["old.txt"]
+    assert suspected["folder2_rel_paths"] == ["new.txt"]
+    assert suspected["count_pairs"] == 1
+
+
+def test_sync_folders_keep_largest_duplicates(sync_db, sync_folders_pair):
+    """Test that keep_largest copies the larger version over the smaller."""
+    folder1, folder2 = sync_folders_pair
+    with open(os.path.join(folder2, "sub", "shared.txt"), "w") as f:
+        f.write("much longer changed content")
+
+    result = sync.sync_folders(folder1, folder2, strategy="keep_largest",
+                               dry_run=False)
+
+    assert result["errors"] == []
+    assert result["resolved_duplicates"] == 1
+    # only2.txt plus the winning folder2 version of shared.txt
+    assert result["copied_to_folder1"] == 2
+    assert result["copied_to_folder2"] == 1
+
+
+def test_reflink_remembers_unsupported_device_pairs(temp_dir, monkeypatch):
+    """Test that FICLONE is not retried between unsupported devices."""
+    import errno
+
+    if sync.fcntl is None or not sync.sys.platform.startswith("linux"):
+        pytest.skip("FICLONE is Linux-only")
+    src = os.path.join(temp_dir, "src.txt")
+    with open(src, "w") as f:
+        f.write("data")
+    calls = []
+
+    def unsupported(fd, request, arg):
+        calls.append(request)
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    monkeypatch.setattr(sync, "_reflink_support", {})
+    monkeypatch.setattr(sync.fcntl, "ioctl", unsupported)
+
+    assert sync._reflink(src, os.path.join(temp_dir, "a.txt")) is False
+    assert sync._reflink(src, os.path.join(temp_dir, "b.txt")) is False
+    assert calls == [sync.FICLONE]
+
+
+def test_analyze_folder_sync_ignores_sibling_prefix_folders(sync_db, temp_dir):
+    """Test that a folder's documents exclude siblings sharing its prefix."""
+    folder1 = os.path.join(temp_dir, "docs")
+    folder2 = os.path.join(temp_dir, "other")
+    sibling = os.path.join(temp_dir, "docs_old")
+    for folder in (folder1, folder2, sibling):
+        os.makedirs(folder)
+    with open(os.path.join(sibling, "stale.txt"), "w") as f:
+        f.write("stale")
+    sync.analyze_folder_sync(sibling, folder2)
+
+    result = sync.analyze_folder_sync(folder1, folder2)
+
+    assert result["missing_count_folder2"] == 0
+    assert result["missing_count_folder1"] == 0
+
+
+@pytest.mark.parametrize("case_insensitive", [False, True])
+def test_under_folder_path_case(sync_db, monkeypatch, case_insensitive):
+    """Test that folder filters ignore case only where paths do."""
+    from app.database import Document
+
+    monkeypatch.setattr(sync, "CASE_INSENSITIVE_PATHS", case_insensitive)
+    db = sync_db()
+    try:
+        for path in ("C:\\Docs\\Sub\\a.txt", "C:\\docs\\b.txt",
+                     "C:\\Docs_old\\c.txt", "C:\\DocsX\\d.txt"):
+            db.add(Document(
+                name=os.path.basename(path), file_path=path, drive="C",
+                directory="C:\\", size=1, size_on_disc=1,
+                md5_hash="a" * 32, file_type=".txt"
+            ))
+        db.commit()
+
+        found = db.query(Document.file_path).filter(
+            sync._under_folder("C:\\Docs\\")
+        ).order_by(Document.file_path).all()
+    finally:
+        db.close()
+
+    rel_path = sync._relative_path("C:\\docs\\b.txt", "C:\\Docs\\")
+    if case_insensitive:
+        assert [row[0] for row in found] == ["C:\\Docs\\Sub\\a.txt",
+                                             "C:\\docs\\b.txt"]
+        assert rel_path == "b.txt"
+    else:
+        assert [row[0] for row in found] == ["C:\\Docs\\Sub\\a.txt"]
+        assert rel_path is None
+    assert sync._relative_path("C:\\Docs\\Sub\\a.txt",
+                               "C:\\Docs\\") == "Sub\\a.txt"
+
+
+def test_analyze_drive_sync_compares_by_md5(sync_db):
+    """Test that drive analysis reports files whose MD5 is absent elsewhere."""
+    from app.database import Document
+
+    db = sync_db()
+    try:
+        for drive, name, md5_hash, size in (
+            ("X", "shared.txt", "a" * 32, 10),
+            ("X", "only_x.txt", "b" * 32, 20),
+            ("Y", "renamed.txt", "a" * 32, 10),
+            ("Y", "only_y.txt", "c" * 32, 30),
+        ):
+            db.add(Document(
+                name=name, file_path=f"{drive}:\\{name}", drive=drive,
+                directory=f"{drive}:\\", size=size, size_on_disc=size,
+                md5_hash=md5_hash, file_type=".txt"
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+    result = sync.analyze_drive_sync("x", "y")
+
+    assert result["missing_on_drive2"] == 1
+    assert result["missing_on_drive1"] == 1
+    assert [d.name for d in result["files_to_copy_drive2"]] == ["only_x.txt"]
+    assert [d.name for d in result["files_to_copy_drive1"]] == ["only_y.txt"]
+    # A second pass (e.g. a sync after a dry-run preview) sees the same rows
+    assert len(result["files_to_copy_drive2"]) == 1
+    assert [d.name for d in result["files_to_copy_drive2"]] == ["only_x.txt"]
+    assert result["space_needed_drive2"] == 20
+    assert result["space_needed_drive1"] == 30
+
+
+def test_analyze_drive_sync_with_empty_drive(sync_db):
+    """Test that every file is missing when the other drive is empty."""
+    from app.database import Document
+
+    db = sync_db()
+    try:
+        for name, md5_hash in (("a.txt", "a" * 32), ("b.txt", "a" * 32)):
+            db.add(Document(
+                name=name, file_path=f"X:\\{name}", drive="X",
+                directory="X:\\", size=5, size_on_disc=5,
+                md5_hash=md5_hash, file_type=".txt"
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+    result = sync.analyze_drive_sync("x", "y")
+
+    assert result["missing_on_drive2"] == 2
+    assert result["missing_on_drive1"] == 0
+    assert result["space_needed_drive2"] == 10
+    assert list(result["files_to_copy_drive1"]) == []
+
+
+def test_index_copies_by_id_reloads_sources(sync_db, temp_dir):
+    """Test that drive copies are indexed from their reloaded source rows."""
+    from app.database import Document
+
+    db = sync_db()
+    try:
+        source = Document(
+            name="src", file_path="X:\\src.txt", drive="X",
+            directory="X:\\", size=4, size_on_disc=4, md5_hash="a" * 32,
+            file_type=".txt", extracted_text="source text"
+        )
+        db.add(source)
+        db.commit()
+        source_id = source.id
+    finally:
+        db.close()
+    target = os.path.join(temp_dir, "copy.txt")
+    errors = []
+
+    sync._index_copies_by_id([(target, source_id),
+                              (os.path.join(temp_dir, "gone.txt"), 999)],
+                             errors)
+
+    assert len(errors) == 1 and "gone.txt" in errors[0]
+    db = sync_db()
+    try:
+        copy = db.query(Document).filter(Document.file_path == target).one()
+        assert copy.md5_hash == "a" * 32
+        assert copy.extracted_text == "source text"
+    finally:
+        db.close()
+
+
+def test_copy_to_drive_skips_colliding_targets(sync_db, temp_dir,
+                                               monkeypatch):
+    """Test that two sources mapped to one target are not copied together."""
+    import hashlib
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+
+    docs = []
+    for sub in ("a", "b"):
+        os.makedirs(os.path.join(temp_dir, sub))
+        path = os.path.join(temp_dir, sub, "same.txt")
+        with open(path, "w") as f:
+            f.write(sub)
+        docs.append(SimpleNamespace(
+            id=len(docs) + 1, file_path=path,
+            md5_hash=hashlib.md5(sub.encode()).hexdigest(),
+            size=1, mtime_ns=None
+        ))
+    out_dir = os.path.join(temp_dir, "out")
+    monkeypatch.setattr(sync, "_index_copies_by_id",
+                        lambda copies, errors: None)
+    monkeypatch.setattr(
+        sync, "_get_target_path",
+        lambda source, drive, target_dir: os.path.join(
+            out_dir, os.path.basename(source))
+    )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        copied, errors = sync._copy_to_drive(executor, docs, "X", "out",
+                                             set())
+
+    target = os.path.join(out_dir, "same.txt")
+    assert copied == [target]
+    assert len(errors) == 1 and docs[0].file_path in errors[0]
+    with open(target) as f:
+        assert f.read() == "b"
+
+
+def test_ensure_dir_records_ancestors(temp_dir, monkeypatch):
+    """Test that creating a directory also marks its parents as existing."""
+    created_dirs = set()
+    nested = os.path.join(temp_dir, "a", "b", "c")
+    sync._ensure_dir(nested, created_dirs)
+    assert os.path.isdir(nested)
+
+    monkeypatch.setattr(sync.os, "makedirs", pytest.fail)
+    sync._ensure_dir(os.path.join(temp_dir, "a", "b"), created_dirs)
+    sync._ensure_dir(nested, created_dirs)
+
+
+def test_sync_folders_indexes_copies_from_source(sync_db, sync_folders_pair):
+    """Test that copied files are indexed with their source's content fields."""
+    from app.database import Document
+
+    folder1, folder2 = sync_folders_pair
+    sync.analyze_folder_sync(folder1, folder2)
+    db = sync_db()
+    try:
+        source = db.query(Document).filter(
+            Document.file_path == os.path.join(folder1, "only1.txt")
+        ).one()
+        source_md5 = source.md5_hash
+        source.extracted_text = "indexed text"
+        db.commit()
+    finally:
+        db.close()
+
+    sync.sync_folders(folder1, folder2, dry_run=False)
+
+    db = sync_db()
+    try:
+        copy = db.query(Document).filter(
+            Document.file_path == os.path.join(folder2, "only1.txt")
+        ).one()
+        assert copy.md5_hash == source_md5
+        assert copy.extracted_text == "indexed text"
+        assert copy.directory == folder2
+    finally:
+        db.close()
+
+
+def test_get_target_path_into_target_dir():
+    """Test that flat target paths match the Path-based layout."""
+    from pathlib import Path
+
+    source = os.path.join(os.sep, "data", "books", "report.pdf")
+    expected = str(Path("E:\\backup") / "report.pdf")
+
+    assert sync._get_target_path(source, "E", "backup") == expected
+    assert sync._get_target_path(source, "E", "backup") == expected
+
+
+def test_get_target_path_keeps_layout():
+    """Test that only the drive letter changes when no target_dir is set."""
+    assert sync._get_target_path("C:\\books\\a.pdf", "D", "") == \
+        "D:\\books\\a.pdf"
+    with pytest.raises(ValueError):
+        sync._get_target_path("/books/a.pdf", "D", "")
+
+
+def test_sync_drives_reuses_given_analysis(monkeypatch):
+    """Test that a previewed analysis is not recomputed for the real sync."""
+    def fail_analysis(drive1, drive2):
+        raise AssertionError("analysis should have been reused")
+
+    monkeypatch.setattr(sync, "analyze_drive_sync", fail_analysis)
+    analysis = {
+        "drive1": "X", "drive2": "Y",
+        "missing_on_drive1": 0, "missing_on_drive2": 0,
+        "space_needed_drive1": 0, "space_needed_drive2": 0,
+        "files_to_copy_drive1": [], "files_to_copy_drive2": [],
+    }
+
+    result = sync.sync_drives("x", "y", dry_run=False, analysis=analysis)
+
+    assert result["status"] == "completed"
+    assert result["copied_to_drive1"] == 0
+    assert result["copied_to_drive2"] == 0
+
+
+def test_sync_drives_reports_logging_failure(monkeypatch):
+    """Test that a failed activity log does not discard the sync result."""
+    def locked(entries):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(sync, "log_activity_bulk", locked)
+    monkeypatch.setattr(sync, "_copy_to_drive",
+                        lambda executor, docs, drive, target_dir,
+                        created_dirs: ([f"{drive}:\\copy.txt"], []))
+    analysis = {
+        "drive1": "X", "drive2": "Y",
+        "missing_on_drive1": 1, "missing_on_drive2": 1,
+        "space_needed_drive1": 0, "space_needed_drive2": 0,
+        "files_to_copy_drive1": [], "files_to_copy_drive2": [],
+    }
+
+    result = sync.sync_drives("x", "y", dry_run=False, analysis=analysis)
+
+    assert result["status"] == "completed"
+    assert result["copied_to_drive1"] == 1
+    assert result["errors"] == [
+        "Error logging sync activity: database is locked"
+    ]
+
+
+def test_relative_path_strips_folder_prefix():
+    """Test relative paths taken by slicing off the folder prefix."""
+    folder = os.path.join(os.sep, "data", "books")
+    prefix = sync._folder_prefix(folder)
+    nested = os.path.join(folder, "sub", "file.pdf")
+
+    assert sync._folder_prefix(prefix) == prefix
+    assert sync._relative_path(nested, prefix) == "sub\\file.pdf"
+    assert sync._relative_path(folder + "2" + os.sep + "x.pdf", prefix) is None
+
+
+def test_fast_copy_without_reflink(temp_dir, monkeypatch):
+    """Test kernel-side copies and the fallback when they are refused."""
+    import errno
+
+    monkeypatch.setattr(sync, "_reflink", lambda src, dst: False)
+    src = os.path.join(temp_dir, "src.bin")
+    data = os.urandom(200_000)
+    with open(src, "wb") as f:
+        f.write(data)
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+
+    dst = os.path.join(temp_dir, "dst.bin")
+    sync._fast_copy(src, dst)
+    with open(dst, "rb") as f:
+        assert f.read() == data
+    assert int(os.stat(dst).st_mtime) == 1_000_000_000
+
+    def cross_device(*args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "copy_file_range", cross_device, raising=False)
+    fallback_dst = os.path.join(temp_dir, "fallback.bin")
+    sync._fast_copy(src, fallback_dst)
+    with open(fallback_dst, "rb") as f:
+        assert f.read() == data
+
+
+def test_copy_workers_setting(monkeypatch):
+    """Test that copy_workers overrides the automatic thread count."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "copy_workers", 0)
+    assert 1 <= sync._copy_workers() <= 32
+    monkeypatch.setattr(settings, "copy_workers", 1)
+    assert sync._copy_workers() == 1
@@ -3,6 +3,7 @@
 import os
 import shutil
 import tempfile
+import functools
 from typing import List, Tuple, Dict
 from contextlib import contextmanager
 from pathlib import Path
@@ -92,3 +93,39 @@ def get_operation_tracker() -> FileOperationTracker:
     """Get the global operation tracker for tests."""
     return _operation_tracker
 
+
+@functools.lru_cache(maxsize=None)
+def hash_test_password(password: str) -> str:
+    """
+    Bcrypt hash for fixture users, computed once per password.
+
+    Uses the minimum cost factor: fixture passwords need a valid hash,
+    not brute-force resistance, and the default cost adds ~100 ms to
+    every database fixture.
+    """
+    import bcrypt
+    return bcrypt.hashpw(
+        password.encode('utf-8'), bcrypt.gensalt(rounds=4)
+    ).decode('utf-8')
+
+
+def create_memory_engine(name: str):
+    """
+    Create an engine on a named, shared-cache in-memory SQLite database.
+
+    StaticPool keeps the one connection open, so every session sees the
+    same database until the engine is disposed.
+
+    Returns:
+        Tuple of (engine, database URL)
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    database_url = f"sqlite:///file:{name}?mode=memory&cache=shared&uri=true"
+    engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    return engine, database_url